@@ -2,9 +2,9 @@
 # vim:fileencoding=UTF-8:ts=4:sw=4:sta:et:sts=4:ai
 from __future__ import (unicode_literals, division, absolute_import, print_function)
 
-import time
 import re
 import locale
+from concurrent.futures import wait
 # from urllib import quote
 from six.moves.urllib.parse import quote
 # from Queue import Queue, Empty
@@ -41,8 +41,8 @@ class Aladin_co_kr(Source):
     name = 'Aladin.co.kr'
     description = _('Downloads metadata and covers from aladin.co.kr')
     author = 'YongSeok Choi'
-    version = (1, 0, 1)
-    minimum_calibre_version = (0, 8, 0)
+    version = (1, 1, 0)
+    minimum_calibre_version = (5, 0, 0)
     
     (_, encoding) = locale.getdefaultlocale()
     if not encoding: encoding = "utf-8"
@@ -236,24 +236,21 @@ class Aladin_co_kr(Source):
             log.error('No matches found with query: %r' % query)
             return
         
-        from calibre_plugins.aladin_co_kr.worker import Worker
-        workers = [Worker(url, result_queue, br, log, i, self) for i, url in enumerate(matches)]
+        from calibre_plugins.aladin_co_kr.worker import Worker, submit_worker
+        workers = [Worker(url, result_queue, br, log, i, self, abort=abort) for i, url in enumerate(matches)]
         
-        for w in workers:
-            w.start()
-            # Don't send all requests at the same time
-            time.sleep(0.1)
-        
-        while not abort.is_set():
-            a_worker_is_alive = False
+        # The shared pool limits how many requests go out at the same time
+        pending = set(submit_worker(w.run) for w in workers)
+        while pending and not abort.is_set():
+            # Returns as soon as the last worker finishes; the timeout only bounds
+            # how long an abort goes unnoticed
+            done, pending = wait(pending, timeout=0.2)
+        if pending:
+            # Aborted: drop queued workers and the connections of running ones
+            for future in pending:
+                future.cancel()
             for w in workers:
-                w.join(0.2)
-                if abort.is_set():
-                    break
-                if w.is_alive():
-                    a_worker_is_alive = True
-            if not a_worker_is_alive:
-                break
+                w.cancel()
         
         return None
     
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# vim:fileencoding=UTF-8:ts=4:sw=4:sta:et:sts=4:ai
+"""
+Time the parsing of saved Aladin detail pages, per page.
+
+    calibre-debug -e benchmarks/bench_parse.py -- PAGES... [--repeat 20]
+
+PAGES are wproduct.aspx pages saved as *.html, response fixtures recorded by
+calibre-web-metadata-aladin's benchmarks/bench_search.py --record (*.json),
+or directories of either. The plugin must be installed. Reported are the
+median milliseconds per page of
+
+    parse     lxml.html.fromstring of the page
+    strings   the detail page lookups as root.xpath('...') strings (1.0.1)
+    compiled  the same lookups with the XPath objects of worker.py and one
+              pass over <head>
+    details   the Worker.parse_* helpers of parse_details, without network
+"""
+
+from __future__ import unicode_literals, division, absolute_import, print_function
+
+import argparse
+import io
+import json
+import os
+import time
+
+from calibre.utils.cleantext import clean_ascii_chars
+from lxml.html import fromstring
+
+from calibre_plugins.aladin_co_kr import worker
+from calibre_plugins.aladin_co_kr.worker import Worker
+
+# the queries parse_details ran for every page up to 1.0.1, compiled each time
+STRING_QUERIES = [
+    "//title",
+    '//*[@id="errorMessage"]',
+    '//meta[@property="og:url"]',
+    '//span[@class="Ere_bo_title"]/..',
+    '//div[@class="tlist"]//a[contains(@href, "AuthorSearch=")]',
+    '//meta[@property="books:isbn"]',
+    '//div[@class="info_list"]//a[contains(@onclick,"showRankLayer()")]/text()',
+    '//meta[@name="Description"]/@content',
+    '//meta[@property="og:image"]/@content',
+    '//ul[@id="ulCategory"]/li',
+    '//ul[@id="ulCategory"]/li//a[contains(@href,"wbrowse.aspx?CID=")]',
+    '//div[@class="tlist"]//a[contains(@href, "PublisherSearch=")]',
+    '//meta[@itemprop="datePublished"]/@content',
+    '//div[@class="conts_info_list1"]//li[text()="언어 : "]/b',
+]
+
+
+class _Silent(object):
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+    def __call__(self, *args, **kwargs):
+        pass
+
+
+class _NoBrowser(object):
+    def clone_browser(self):
+        return self
+
+
+def load_pages(paths):
+    """(name, html) of every detail page under paths"""
+    for path in paths:
+        if os.path.isdir(path):
+            for page in load_pages(
+                [os.path.join(path, name) for name in sorted(os.listdir(path))]
+            ):
+                yield page
+        elif path.endswith(".json"):
+            with io.open(path, encoding="utf-8") as f:
+                fixture = json.load(f)
+            if "wproduct.aspx" in fixture.get("url", "") and fixture["status"] == 200:
+                yield os.path.basename(path), fixture["body"]
+        elif path.endswith((".html", ".htm")):
+            with io.open(path, "rb") as f:
+                yield os.path.basename(path), f.read().decode("utf-8", errors="replace")
+
+
+def strings(root):
+    for query in STRING_QUERIES:
+        root.xpath(query)
+
+
+def compiled(root, w):
+    w._head_root = None
+    root.findall("head/title")
+    worker.XP_ERROR_MESSAGE(root)
+    for key in ("og:url", "books:isbn", "Description", "og:image", "datePublished"):
+        w._head_meta(root, key)
+    for xpath in (
+        worker.XP_TITLE_NODE,
+        worker.XP_AUTHORS,
+        worker.XP_RATING,
+        worker.XP_CATEGORIES,
+        worker.XP_CATEGORY_LINKS,
+        worker.XP_PUBLISHER,
+        worker.XP_LANGUAGE,
+    ):
+        xpath(root)
+
+
+def details(root, w):
+    w._head_root = None
+    w.parse_aladin_id("", root)
+    w.parse_title_series(root)
+    w.parse_authors(root)
+    w.parse_isbn(root)
+    w.parse_rating(root)
+    w.parse_tags(root)
+    w.parse_publisher_and_date(root)
+    w._parse_language(root)
+    w._parse_category(root)
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2] if values else 0.0
+
+
+def bench(raw, repeat):
+    w = Worker("", None, _NoBrowser(), _Silent(), 0, None)
+    timings = {"parse": [], "strings": [], "compiled": [], "details": []}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        root = fromstring(clean_ascii_chars(raw))
+        timings["parse"].append(time.perf_counter() - start)
+        for name, run in (
+            ("strings", lambda: strings(root)),
+            ("compiled", lambda: compiled(root, w)),
+            # last: parse_title_series takes the series out of the tree
+            ("details", lambda: details(root, w)),
+        ):
+            start = time.perf_counter()
+            run()
+            timings[name].append(time.perf_counter() - start)
+    return dict((name, median(values) * 1000) for name, values in timings.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pages", nargs="+", help="saved pages, fixtures or directories")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    columns = ("parse", "strings", "compiled", "details")
+    totals = dict((name, []) for name in columns)
+    print("%-44s" % "ms per page" + "".join("%10s" % name for name in columns))
+    for name, raw in load_pages(args.pages):
+        result = bench(raw, args.repeat)
+        for column in columns:
+            totals[column].append(result[column])
+        print("%-44s" % name[:44] + "".join("%10.2f" % result[c] for c in columns))
+    if not totals["parse"]:
+        parser.error("no detail pages found")
+    print("%-44s" % "median" + "".join("%10.2f" % median(totals[c]) for c in columns))
+
+
+if __name__ == "__main__":
+    main()
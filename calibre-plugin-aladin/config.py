@@ -62,6 +62,7 @@ KEY_GET_ALL_AUTHORS = 'getAllAuthors'
 KEY_APPEND_TOC = 'appendTOC'
 KEY_COMMENTS_SUFFIX = 'commentsSuffix'
 KEY_MAX_DOWNLOADS = 'maxDownloads'
+KEY_MAX_WORKERS = 'maxWorkers'
 
 DEFAULT_GENRE_MAPPINGS = {
     'Anthologies': ['Anthologies'],
@@ -131,7 +132,8 @@ DEFAULT_STORE_VALUES = {
     KEY_CATEGORY_PREFIX: '☞',  # ▣
     KEY_APPEND_TOC: True,
     KEY_COMMENTS_SUFFIX: '<hr /><div><div style="float:right">[aladin.co.kr]</div></div>',
-    KEY_MAX_DOWNLOADS: 5
+    KEY_MAX_DOWNLOADS: 5,
+    KEY_MAX_WORKERS: 4
 }
 
 # This is where all preferences for this plugin will be stored
@@ -351,6 +353,17 @@ class ConfigWidget(DefaultConfigWidget):
         self.max_downloads_spin.setProperty('value', c.get(KEY_MAX_DOWNLOADS, DEFAULT_STORE_VALUES[KEY_MAX_DOWNLOADS]))
         other_group_box_layout.addWidget(self.max_downloads_spin)
         
+        workers_label = QLabel(_('Maximum book pages downloaded at the same time:'), self)
+        workers_label.setToolTip(_('Book pages are downloaded by a pool of this many threads,\n'
+                                   'shared by all searches running at the same time.\n'
+                                   'Lower it if Aladin refuses requests during bulk downloads.\n '))
+        other_group_box_layout.addWidget(workers_label)
+        self.max_workers_spin = QtGui.QSpinBox(self)
+        self.max_workers_spin.setMinimum(1)
+        self.max_workers_spin.setMaximum(20)
+        self.max_workers_spin.setProperty('value', c.get(KEY_MAX_WORKERS, DEFAULT_STORE_VALUES[KEY_MAX_WORKERS]))
+        other_group_box_layout.addWidget(self.max_workers_spin)
+        
         self.edit_table.populate_table(c[KEY_GENRE_MAPPINGS])
     
     def commit(self):
@@ -365,6 +378,7 @@ class ConfigWidget(DefaultConfigWidget):
         new_prefs[KEY_APPEND_TOC] = self.toc_checkbox.checkState() == Qt.Checked
         new_prefs[KEY_COMMENTS_SUFFIX] = str(self.comments_suffix_edit.text())
         new_prefs[KEY_MAX_DOWNLOADS] = int(unicode(self.max_downloads_spin.value()))
+        new_prefs[KEY_MAX_WORKERS] = int(unicode(self.max_workers_spin.value()))
         plugin_prefs[STORE_NAME] = new_prefs
     
     def get_category_checkbox_changed(self):
@@ -6,15 +6,20 @@ import datetime
 import lxml
 import re
 import socket
+import time
 from collections import OrderedDict
-from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from threading import Event, Lock
 
 import calibre_plugins.aladin_co_kr.config as cfg
 from calibre.ebooks.metadata.book.base import Metadata
 from calibre.library.comments import sanitize_comments_html
 from calibre.utils.cleantext import clean_ascii_chars
 from calibre.utils.localization import canonicalize_lang
+from lxml import etree
 from lxml.html import fromstring, tostring
+from mechanize import Request
 
 from six import text_type as unicode
 
@@ -23,20 +28,202 @@ __license__ = "GPL v3"
 __copyright__ = "2014, YongSeok Choi <sseeookk@gmail.com> based on the Goodreads work by Grant Drake <grant.drake@gmail.com>"
 __docformat__ = "restructuredtext en"
 
+_pools = {}  # thread name prefix -> (size, executor)
+_pools_lock = Lock()
+
+# bytes read at a time, so an abort stops a download after one chunk
+READ_CHUNK = 64 * 1024
+
+
+# Checked cover URLs, so a bulk download asks about each cover once.
+# Broken covers are checked again sooner, Aladin fixes them now and then.
+COVER_CHECK_TTL = 24 * 60 * 60
+COVER_BROKEN_TTL = 60 * 60
+COVER_CHECK_MAX = 10000
+# smaller images are Aladin's placeholders
+MIN_COVER_SIZE = 1000
+
+# getContents.aspx fragments with a description, in order of preference:
+# 책소개 (most domestic books, and the only one with the table of contents)
+# and 출판사 제공 책소개 (most foreign books)
+FRAGMENT_URL = (
+    "http://www.aladin.co.kr/shop/product/getContents.aspx?ISBN=%s&name=%s&type=0&date=%s"
+)
+FRAGMENT_NAMES = ("Introduce", "PublisherDesc")
+# Until a category (domestic, foreign) has had this many descriptions both
+# fragments are requested at once. After that, if the first fragment usually
+# has it, the second one is only requested when the first comes back empty.
+FRAGMENT_LEARN_AFTER = 3
+
+_fragment_wins = {}  # category -> {fragment name: descriptions found}
+_fragment_wins_lock = Lock()
+
+# Queries of the detail page, compiled once instead of for every book.
+# <meta> in <head> (og:url, og:image, books:isbn, ...) is read in one pass by
+# Worker._head_meta instead.
+XP_TITLE = etree.XPath("//title")
+XP_ERROR_MESSAGE = etree.XPath('//*[@id="errorMessage"]')
+XP_TITLE_NODE = etree.XPath('//span[@class="Ere_bo_title"]/..')
+XP_SERIES = etree.XPath('.//a[contains(@href,"wseriesitem.aspx")]')
+XP_AUTHORS = etree.XPath('//div[@class="tlist"]//a[contains(@href, "AuthorSearch=")]')
+XP_RATING = etree.XPath(
+    '//div[@class="info_list"]//a[contains(@onclick,"showRankLayer()")]/text()'
+)
+XP_PUBLISHER = etree.XPath(
+    '//div[@class="tlist"]//a[contains(@href, "PublisherSearch=")]'
+)
+XP_DATE_PUBLISHED = etree.XPath('//meta[@itemprop="datePublished"]/@content')
+XP_CATEGORIES = etree.XPath('//ul[@id="ulCategory"]/li')
+XP_CATEGORY_FOLD = etree.XPath("./a[text()='접기']")
+XP_CATEGORY_LINKS = etree.XPath(
+    '//ul[@id="ulCategory"]/li//a[contains(@href,"wbrowse.aspx?CID=")]'
+)
+XP_TOP_CATEGORY = etree.XPath('//ul[@id="ulCategory"]/li[1]/a[1]/text()')
+XP_LANGUAGE = etree.XPath('//div[@class="conts_info_list1"]//li[text()="언어 : "]/b')
+# getContents.aspx fragments
+XP_INTRODUCE = etree.XPath(
+    './/div[@class="Ere_prod_mconts_box"]//div[text()="책소개"]/..//div[@class="Ere_prod_mconts_R"]'
+)
+XP_PUBLISHER_DESC = etree.XPath(
+    './/div[@class="Ere_prod_mconts_box"]//div[text()="출판사 제공 책소개"]/..'
+    '//div[@class="Ere_prod_mconts_R"]'
+)
+XP_TOC_ALL = etree.XPath('//div[@id="div_TOC_All"]//p')
+XP_TOC_SHORT = etree.XPath('//div[@id="div_TOC_Short"]//p')
+
+_cover_checks = OrderedDict()  # url -> (checked at, valid)
+_cover_checks_lock = Lock()
+
+
+class Aborted(Exception):
+    """calibre aborted the identify this Worker belongs to"""
+
+
+def _response_socket(response):
+    """
+    The socket under a (mechanize wrapped) urllib response, None if it
+    can't be found or the response is closed already.
+    """
+    seen = set()
+    todo = [response]
+    while todo:
+        obj = todo.pop()
+        if obj is None or id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, socket.socket):
+            return obj
+        # mechanize wrapper -> http.client response -> buffered reader -> SocketIO
+        for name in ("wrapped", "fp", "_fp", "raw", "_sock", "sock"):
+            try:
+                todo.append(getattr(obj, name, None))
+            except Exception:
+                pass
+    return None
+
+
+def _cached_cover_check(url):
+    with _cover_checks_lock:
+        entry = _cover_checks.get(url)
+    if entry is None:
+        return None
+    checked, valid = entry
+    ttl = COVER_CHECK_TTL if valid else COVER_BROKEN_TTL
+    if time.time() - checked > ttl:
+        return None
+    return valid
+
+
+def _store_cover_check(url, valid):
+    with _cover_checks_lock:
+        _cover_checks.pop(url, None)
+        _cover_checks[url] = (time.time(), valid)
+        while len(_cover_checks) > COVER_CHECK_MAX:
+            _cover_checks.popitem(last=False)
+
+
+def _max_workers():
+    default_max_workers = cfg.DEFAULT_STORE_VALUES[cfg.KEY_MAX_WORKERS]
+    return cfg.plugin_prefs[cfg.STORE_NAME].get(
+        cfg.KEY_MAX_WORKERS, default_max_workers
+    )
+
+
+def _submit(name, size, fn, *args):
+    # Submitting under the lock which guards the shutdown, so a pool
+    # replaced by another thread is never handed out.
+    with _pools_lock:
+        current = _pools.get(name)
+        if current is None or current[0] != size:
+            # 설정이 바뀌면 새 풀을 만들고, 이전 풀에 들어간 일은 마저 끝난다.
+            if current is not None:
+                current[1].shutdown(wait=False)
+            current = _pools[name] = (
+                size,
+                ThreadPoolExecutor(max_workers=size, thread_name_prefix=name),
+            )
+        return current[1].submit(fn, *args)
+
+
+def submit_worker(fn, *args):
+    """
+    Run fn on the thread pool of the Workers of every identify call, so a
+    bulk download never has more than KEY_MAX_WORKERS book pages in flight.
+    """
+    return _submit("aladin_co_kr", _max_workers(), fn, *args)
+
 
-class Worker(Thread):  # Get details
+def submit_fragment(fn, *args):
     """
-    Get book details from Aladin book page in a separate thread
+    Run fn on the thread pool for the getContents.aspx requests of running
+    Workers, two per Worker. Separate from the Worker pool so a Worker
+    waiting for its fragments never waits for a thread held by another Worker.
     """
+    return _submit("aladin_co_kr_desc", 2 * _max_workers(), fn, *args)
+
+
+def _preferred_fragment(category):
+    """The fragment which usually has the description in category, None if not known yet"""
+    with _fragment_wins_lock:
+        wins = dict(_fragment_wins.get(category, {}))
+    if sum(wins.values()) < FRAGMENT_LEARN_AFTER:
+        return None
+    return max(FRAGMENT_NAMES, key=lambda name: wins.get(name, 0))
 
-    def __init__(self, url, result_queue, browser, log, relevance, plugin, timeout=20):
-        Thread.__init__(self)
-        self.daemon = True
+
+def _record_fragment(category, name):
+    with _fragment_wins_lock:
+        wins = _fragment_wins.setdefault(category, {})
+        wins[name] = wins.get(name, 0) + 1
+
+
+class Worker(object):  # Get details
+    """
+    Get book details from Aladin book page, run by submit_worker()
+    """
+
+    def __init__(
+        self,
+        url,
+        result_queue,
+        browser,
+        log,
+        relevance,
+        plugin,
+        timeout=20,
+        abort=None,
+    ):
         self.url, self.result_queue = url, result_queue
         self.log, self.timeout = log, timeout
         self.relevance, self.plugin = relevance, plugin
         self.browser = browser.clone_browser()
         self.cover_url = self.aladin_id = self.isbn = None
+        self.abort = abort if abort is not None else Event()
+        # responses being read, shut down by cancel()
+        self._responses = set()
+        self._responses_lock = Lock()
+        self._head_root = self._head = None
+        self._head_all = False
 
         lm = {
             "eng": ("English", "Englisch", "ENG"),
@@ -61,14 +248,79 @@ class Worker(Thread):  # Get details
     def run(self):
         try:
             self.get_details()
+        except Aborted:
+            self.log.info("Aborted: %r" % self.url)
         except:
             self.log.exception("get_details failed for url: %r" % self.url)
 
+    def cancel(self):
+        """
+        Shut down the connections of this Worker, called by identify on abort.
+        A read blocked in another thread returns at once instead of running
+        into its timeout, and the reading thread closes the response itself.
+        Closing it from here would not wake that read up and would wait for
+        it, so close() is only the last resort when no socket is found.
+        """
+        with self._responses_lock:
+            responses = list(self._responses)
+        for response in responses:
+            sock = _response_socket(response)
+            try:
+                if sock is not None:
+                    sock.shutdown(socket.SHUT_RDWR)
+                else:
+                    response.close()
+            except:
+                pass
+
+    @contextmanager
+    def _request(self, url, method=None, headers=None, browser=None):
+        if self.abort.is_set():
+            raise Aborted(url)
+        target = url
+        if method or headers:
+            target = Request(url, headers=headers or {}, method=method)
+        browser = browser or self.browser
+        response = browser.open_novisit(target, timeout=self.timeout)
+        with self._responses_lock:
+            self._responses.add(response)
+        try:
+            yield response
+        except Exception:
+            if self.abort.is_set():
+                raise Aborted(url)
+            raise
+        finally:
+            with self._responses_lock:
+                self._responses.discard(response)
+            response.close()
+
+    def _open(self, url, stop=None, browser=None):
+        """
+        The body of url, read in chunks which give up as soon as calibre aborts.
+        Setting the optional stop Event ends the download early with b"".
+        """
+        chunks = []
+        with self._request(url, browser=browser) as response:
+            while True:
+                if self.abort.is_set():
+                    raise Aborted(url)
+                if stop is not None and stop.is_set():
+                    return b""
+                chunk = response.read(READ_CHUNK)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        # a connection shut down by cancel() ends like a short download
+        if self.abort.is_set():
+            raise Aborted(url)
+        return b"".join(chunks)
+
     def get_details(self):
         try:
-            raw = (
-                self.browser.open_novisit(self.url, timeout=self.timeout).read().strip()
-            )
+            raw = self._open(self.url).strip()
+        except Aborted:
+            raise
         except Exception as e:
             if callable(getattr(e, "getcode", None)) and e.getcode() == 404:
                 self.log.error("URL malformed: %r" % self.url)
@@ -101,7 +353,7 @@ class Worker(Thread):  # Get details
             # Look at the <title> attribute for page to make sure that we were actually returned
             # a details page for a book. If the user had specified an invalid ISBN, then the results
             # page will just do a textual search.
-            title_node = root.xpath("//title")
+            title_node = root.findall("head/title") or XP_TITLE(root)
             if title_node:
                 page_title = title_node[0].text_content().strip()
 
@@ -120,7 +372,7 @@ class Worker(Thread):  # Get details
             self.log.exception(msg)
             return
 
-        errmsg = root.xpath('//*[@id="errorMessage"]')
+        errmsg = XP_ERROR_MESSAGE(root)
         if errmsg:
             msg = "Failed to parse aladin details page: %r" % self.url
             msg += tostring(errmsg, method="text", encoding=unicode).strip()
@@ -176,11 +428,15 @@ class Worker(Thread):  # Get details
 
         try:
             mi.comments = self.parse_comments(root)
+        except Aborted:
+            raise
         except:
             self.log.exception("Error parsing comments for url: %r" % self.url)
 
         try:
             self.cover_url = self.parse_cover(root)
+        except Aborted:
+            raise
         except:
             self.log.exception("Error parsing cover for url: %r" % self.url)
         mi.has_cover = bool(self.cover_url)
@@ -227,7 +483,7 @@ class Worker(Thread):  # Get details
             return match.group(1)
 
         # <meta property="og:url" content="https://www.aladin.co.kr/shop/wproduct.aspx?ItemId=125451796" />
-        page_url = root.xpath('//meta[@property="og:url"]')[0].attrib["content"]
+        page_url = self._head_meta(root, "og:url")
         return re.search(r"wproduct\.aspx\?ItemId=(.+)", page_url).group(1)
 
     def parse_title_series(self, root):
@@ -242,12 +498,12 @@ class Worker(Thread):  # Get details
 
         # 2023-08-03 수정
         # title_node = root.xpath('//a[@class="Ere_bo_title"]/..')
-        title_node = root.xpath('//span[@class="Ere_bo_title"]/..')
+        title_node = XP_TITLE_NODE(root)
         if not title_node:
             return None, None, None
         title_text = title_node[0].text_content().strip()
 
-        series_node = title_node[0].xpath('.//a[contains(@href,"wseriesitem.aspx")]')
+        series_node = XP_SERIES(title_node[0])
         if not series_node:
             return title_text, None, None
         series_info = series_node[0].text_content().strip()
@@ -337,9 +593,7 @@ class Worker(Thread):  # Get details
             cfg.KEY_GET_ALL_AUTHORS, default_get_all_authors
         )
 
-        author_nodes = root.xpath(
-            '//div[@class="tlist"]//a[contains(@href, "AuthorSearch=")]'
-        )
+        author_nodes = XP_AUTHORS(root)
         if author_nodes:
             authors = []
 
@@ -378,9 +632,7 @@ class Worker(Thread):  # Get details
         # class="Ere_sub_pink Ere_fs16 Ere_str">8.7 </a>
         # 별 이미지와 숫자가 같이 있다.
         # 그래서 숫자가 있는 것을 고르기 위해 for 구문
-        rating_nodes = root.xpath(
-            '//div[@class="info_list"]//a[contains(@onclick,"showRankLayer()")]/text()'
-        )
+        rating_nodes = XP_RATING(root)
         if rating_nodes:
             for rating_node in rating_nodes:
                 rating_value = rating_node.strip()
@@ -396,41 +648,11 @@ class Worker(Thread):  # Get details
         # 외국 도서 : 출판사 제공 책소개"
         # https://www.aladin.co.kr/shop/product/getContents.aspx?ISBN=1491919531&name=PublisherDesc&type=0&date=15
 
-        names = ["Introduce", "PublisherDesc"]
-
         comments = ""
         toc = ""
-        rawDesc = ""
-        urlDesc = ""
 
-        for name in names:
-            urlDesc = (
-                "http://www.aladin.co.kr/shop/product/getContents.aspx?ISBN=%s&name=%s&type=0&date=%s"
-                % (self.isbn, name, datetime.datetime.now().hour)
-            )
-
-            try:
-                self.browser.addheaders = [("Referer", self.url)]
-                rawDesc = (
-                    self.browser.open_novisit(urlDesc, timeout=self.timeout)
-                    .read()
-                    .strip()
-                )
-
-                if len(rawDesc) > 0:
-                    break
-            except Exception as e:
-                if callable(getattr(e, "getcode", None)) and e.getcode() == 404:
-                    self.log.error("URL malformed: %r" % urlDesc)
-                else:
-                    attr = getattr(e, "args", [None])
-                    attr = attr if attr else [None]
-                    if isinstance(attr[0], socket.timeout):
-                        msg = "Aladin timed out. Try again later."
-                        self.log.error(msg)
-                    else:
-                        msg = "Failed to make Descrpitions query: %r" % urlDesc
-                        self.log.exception(msg)
+        self.browser.addheaders = [("Referer", self.url)]
+        rawDesc, urlDesc = self._fetch_description(root)
 
         if rawDesc:
             rootDesc = None
@@ -454,9 +676,7 @@ class Worker(Thread):  # Get details
                 #         <div class="Ere_prod_mconts_LS">책소개</div>
                 #         <div class="Ere_prod_mconts_LL">책소개</div>
                 #         <div class="Ere_prod_mconts_R">
-                introduce_nodes = rootDesc.xpath(
-                    './/div[@class="Ere_prod_mconts_box"]//div[text()="책소개"]/..//div[@class="Ere_prod_mconts_R"]'
-                )
+                introduce_nodes = XP_INTRODUCE(rootDesc)
 
                 # 2021-06-24
                 # <!-- 출판사 제공 책소개 start-->
@@ -474,10 +694,7 @@ class Worker(Thread):  # Get details
                 # </div>
                 # <!-- 출판사 제공 책소개 end-->
                 if not introduce_nodes:
-                    introduce_nodes = rootDesc.xpath(
-                        './/div[@class="Ere_prod_mconts_box"]//div[text()="출판사 제공 책소개"]/..'
-                        '//div[@class="Ere_prod_mconts_R"]'
-                    )
+                    introduce_nodes = XP_PUBLISHER_DESC(rootDesc)
 
                 if introduce_nodes:
                     # self.log('Got a comments description node')
@@ -505,18 +722,17 @@ class Worker(Thread):  # Get details
             #             <div id="div_TOC_Short" style="word-break: break-all">
             #             <a href="javascript:fn_show_introduce_TOC('TOC')"><p><B>0장 도입</B>
             if rootDesc is not None and append_toc:
-                toc_node = rootDesc.xpath('//div[@id="div_TOC_All"]//p')
+                toc_node = XP_TOC_ALL(rootDesc)
                 if not toc_node:
-                    toc_node = rootDesc.xpath('//div[@id="div_TOC_Short"]//p')
+                    toc_node = XP_TOC_SHORT(rootDesc)
                 if toc_node:
                     toc = tostring(toc_node[0], method="html")
                     toc = sanitize_comments_html(toc)
         if not comments:
             # Look for description in a meta
-            description_node = root.xpath('//meta[@name="Description"]/@content')
-            if description_node:
-                # return description_node[0]
-                comments = description_node[0]
+            description = self._head_meta(root, "Description")
+            if description:
+                comments = description
         if comments:
             comments = '<div id="comments">' + comments + "</div>"
         if toc:
@@ -531,6 +747,75 @@ class Worker(Thread):  # Get details
                 comments += comments_suffix
         return comments
 
+    def _fetch_description(self, root):
+        """
+        (body, url) of the getContents.aspx fragment with the description:
+        the first non-empty one in the order of FRAGMENT_NAMES. The later ones
+        are requested at the same time as the first, unless the book's
+        category has learned that the first one usually has it.
+        """
+        category = self._parse_category(root)
+        if _preferred_fragment(category) == FRAGMENT_NAMES[0]:
+            url = ""
+            for name in FRAGMENT_NAMES:
+                raw, url = self._fetch_fragment(name)
+                if raw:
+                    _record_fragment(category, name)
+                    return raw, url
+            return b"", url
+
+        stop = Event()
+        futures = []
+        for name in FRAGMENT_NAMES:
+            # mechanize browsers can't be shared between threads
+            browser = self.browser.clone_browser()
+            futures.append(submit_fragment(self._fetch_fragment, name, stop, browser))
+        raw, url = b"", ""
+        try:
+            # in order, so a later fragment never beats a non-empty earlier one
+            for name, future in zip(FRAGMENT_NAMES, futures):
+                raw, url = future.result()
+                if raw:
+                    _record_fragment(category, name)
+                    break
+        finally:
+            # the loser stops after its current chunk, or never starts
+            stop.set()
+            for future in futures:
+                future.cancel()
+        return raw, url
+
+    def _fetch_fragment(self, name, stop=None, browser=None):
+        url = FRAGMENT_URL % (self.isbn, name, datetime.datetime.now().hour)
+        try:
+            return self._open(url, stop=stop, browser=browser).strip(), url
+        except Aborted:
+            raise
+        except Exception as e:
+            if callable(getattr(e, "getcode", None)) and e.getcode() == 404:
+                self.log.error("URL malformed: %r" % url)
+            else:
+                attr = getattr(e, "args", [None])
+                attr = attr if attr else [None]
+                if isinstance(attr[0], socket.timeout):
+                    msg = "Aladin timed out. Try again later."
+                    self.log.error(msg)
+                else:
+                    msg = "Failed to make Descrpitions query: %r" % url
+                    self.log.exception(msg)
+        return b"", url
+
+    def _parse_category(self, root):
+        # <ul id="ulCategory"><li><a href="/home/wforeignmain.aspx">외국도서</a>&nbsp;&gt;&nbsp;...
+        top = XP_TOP_CATEGORY(root)
+        if top:
+            return "foreign" if "외국도서" in top[0] else "domestic"
+        # 978-89, 979-11: Korean publishers
+        isbn = self.isbn or ""
+        if not isbn or isbn.startswith(("97889", "97911", "89")):
+            return "domestic"
+        return "foreign"
+
     def parse_cover(self, root):
         # http://image.aladin.co.kr/product/466/2/cover/8971460326_1.jpg
         # http://image.aladin.co.kr/product/466/2/letslook/8971460326_f.jpg
@@ -545,10 +830,9 @@ class Worker(Thread):  # Get details
         # no image:
         # <meta property="og:image" content="https://image.aladin.co.kr/img/shop/2018/img_no.jpg"/>
 
-        imgcol_node = root.xpath('//meta[@property="og:image"]/@content')
+        img_url_small = self._head_meta(root, "og:image")
 
-        if imgcol_node:
-            img_url_small = imgcol_node[0]
+        if img_url_small:
             # aladin have no image.
             # http://image.aladin.co.kr/img/noimg_b.gif
             if "noimg" in img_url_small or "img_no.jpg" in img_url_small:
@@ -567,19 +851,43 @@ class Worker(Thread):  # Get details
                 # img_url = re.sub(r"_\d.jpg", "_f.jpg", img_url)
                 # img_url = re.sub(r"_\d.gif", "_f.jpg", img_url)
 
-            try:
-                # Unfortunately Aladin sometimes have broken links so we need to do
-                # an additional request to see if the URL actually exists
-                info = self.browser.open_novisit(img_url, timeout=self.timeout).info()
-                # if int(info.getheader('Content-Length')) > 1000:  # Python 2
-                if int(info.get("Content-Length")) > 1000:  # Python 3
-                    return img_url
-                else:
-                    self.log.warning("Broken image for url: %s" % img_url)
-            except:
-                # self.log.info(e)
-                self.log.info("parse_cover error!")
-                pass
+            # Unfortunately Aladin sometimes have broken links so we need to do
+            # an additional request to see if the URL actually exists
+            valid = _cached_cover_check(img_url)
+            if valid is None:
+                try:
+                    valid = self._cover_size(img_url) > MIN_COVER_SIZE
+                except Aborted:
+                    raise
+                except:
+                    # self.log.info(e)
+                    self.log.info("parse_cover error!")
+                    return
+                _store_cover_check(img_url, valid)
+            if valid:
+                return img_url
+            self.log.warning("Broken image for url: %s" % img_url)
+
+    def _cover_size(self, img_url):
+        """Size of the image in bytes, asked with HEAD or else for its first byte"""
+        try:
+            with self._request(img_url, method="HEAD") as response:
+                size = response.info().get("Content-Length")
+            if size:
+                return int(size)
+        except Aborted:
+            raise
+        except Exception as e:
+            self.log.info("HEAD failed for %s: %s" % (img_url, e))
+
+        with self._request(img_url, headers={"Range": "bytes=0-0"}) as response:
+            info = response.info()
+        # 206 Partial Content: "bytes 0-0/12345"
+        content_range = info.get("Content-Range")
+        if content_range and "/" in content_range:
+            return int(content_range.rsplit("/", 1)[1])
+        # 200: the range was ignored, the body is left unread
+        return int(info.get("Content-Length"))
 
     def parse_isbn(self, root):
         # isbn_nodes = root.xpath('//div[@class="p_goodstd03"]')
@@ -589,9 +897,7 @@ class Worker(Thread):  # Get details
         #         return match.group(1)
 
         # <meta property="books:isbn" content="9791162240281" />
-        isbn_nodes = root.xpath('//meta[@property="books:isbn"]')
-        if isbn_nodes:
-            return isbn_nodes[0].attrib["content"]
+        return self._head_meta(root, "books:isbn")
 
     def parse_publisher_and_date(self, root):
         # Publisher is specified within the a :
@@ -625,17 +931,18 @@ class Worker(Thread):  # Get details
         # <span class="Ere_PR10"></span><a
         # class="Ere_sub2_title" href="/search/wsearchresult.aspx?SearchTarget=Foreign&amp;SearchWord=Head+First
         # +Python%2c+First+Edition+Paul+Barry">원제 : Head First Python, First Edition</a></li>
-        publisher_node = root.xpath(
-            '//div[@class="tlist"]//a[contains(@href, "PublisherSearch=")]'
-        )
+        publisher_node = XP_PUBLISHER(root)
 
         if publisher_node:
             publisher = publisher_node[0].text_content()
 
         # <meta itemprop="datePublished" content="2017-12-04">
-        pub_date_nodes = root.xpath('//meta[@itemprop="datePublished"]/@content')
-        if pub_date_nodes:
-            pub_date = self._convert_date_text_hyphen(pub_date_nodes[0])
+        pub_date = self._head_meta(root, "datePublished")
+        if not pub_date:
+            pub_date_nodes = XP_DATE_PUBLISHED(root)
+            pub_date = pub_date_nodes[0] if pub_date_nodes else None
+        if pub_date:
+            pub_date = self._convert_date_text_hyphen(pub_date)
 
         return publisher, pub_date
 
@@ -675,13 +982,13 @@ class Worker(Thread):  # Get details
             # genres_node = root.xpath('//div[@class="p_categorize"]/ul/li')
 
             # 2021-06-24
-            genres_node = root.xpath('//ul[@id="ulCategory"]/li')
+            genres_node = XP_CATEGORIES(root)
 
             # self.log.info("Parsing categories")
             if genres_node:
                 # self.log.info("Found genres_node")
                 for genre in genres_node:
-                    for bad in genre.xpath("./a[text()='접기']"):
+                    for bad in XP_CATEGORY_FOLD(genre):
                         genre.remove(bad)
                     genre = genre.text_content().strip()
                     # &nbsp; 를 공란(space)로 변환
@@ -718,9 +1025,7 @@ class Worker(Thread):  # Get details
         tags_list = None
         if not aladin_category_lookup:
             # tags_list = root.xpath('//ul[@id="ulCategory"]/li//a[contains(@href,"wbrowse.aspx?CID=")]/text()')
-            tags_list = root.xpath(
-                '//ul[@id="ulCategory"]/li//a[contains(@href,"wbrowse.aspx?CID=")]'
-            )
+            tags_list = XP_CATEGORY_LINKS(root)
             # tags_list = root.xpath('string(//ul[@id="ulCategory"]/li//a[contains(@href,"wbrowse.aspx?CID=")])')
 
             # self.log.info("Parsing tags")
@@ -821,9 +1126,7 @@ class Worker(Thread):  # Get details
         #         raw = match.group(1)
 
         # 2021-06-24
-        lang_node = root.xpath(
-            '//div[@class="conts_info_list1"]//li[text()="언어 : "]/b'
-        )
+        lang_node = XP_LANGUAGE(root)
         if lang_node:
             raw = lang_node[0].text_content()
 
@@ -834,6 +1137,30 @@ class Worker(Thread):  # Get details
         if ans:
             return ans
 
+    def _head_meta(self, root, key):
+        """
+        content of the <meta> tag with property, name or itemprop key, None if
+        there is none. The tags in <head> are collected in one pass and kept for
+        the page being parsed. A stray element in <head> (an <img>, text) makes
+        libxml2 start <body> there, taking all <meta> tags after it along, so a
+        key missing from <head> is looked up once in the whole page.
+        """
+        if self._head_root is not root:
+            head = root.find("head")
+            self._head_root, self._head = root, {}
+            self._head_all = head is None
+            self._collect_meta(root if head is None else head)
+        if key not in self._head and not self._head_all:
+            self._head_all = True
+            self._collect_meta(root)
+        return self._head.get(key)
+
+    def _collect_meta(self, element):
+        for node in element.iter("meta"):
+            key = node.get("property") or node.get("name") or node.get("itemprop")
+            if key and key not in self._head:
+                self._head[key] = node.get("content")
+
     def _removeTags(self, element, tags):
         try:
             for node in element.getchildren():
@@ -19,9 +19,11 @@
 import concurrent.futures
 import requests
 import json
+import re
 from bs4 import BeautifulSoup as BS  # requirement
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
 
 try:
     import cchardet  # optional for better speed
@@ -31,15 +33,117 @@ except ImportError:
 from cps.services.Metadata import MetaRecord, MetaSourceInfo, Metadata
 import cps.logger as logger
 
+if __package__:
+    # calibre-web: cps/metadata_provider/aladin_support
+    from .aladin_support import (
+        BatchSearch,
+        CircuitOpen,
+        Deadline,
+        PooledTransport,
+        SingleFlight,
+        canonical_url,
+        cover_url,
+        get_cache,
+        get_quota,
+        is_korean,
+        item_authors,
+        item_description,
+        log_metrics,
+        lookup_item,
+        lookup_url,
+        miss_key,
+        normalize_isbn,
+        phase,
+        redact,
+    )
+else:
+    # 저장소에서 바로 실행할 때 (python aladin.py, benchmarks)
+    from aladin_support import (
+        BatchSearch,
+        CircuitOpen,
+        Deadline,
+        PooledTransport,
+        SingleFlight,
+        canonical_url,
+        cover_url,
+        get_cache,
+        get_quota,
+        is_korean,
+        item_authors,
+        item_description,
+        log_metrics,
+        lookup_item,
+        lookup_url,
+        miss_key,
+        normalize_isbn,
+        phase,
+        redact,
+    )
+
 # from time import time
 from operator import itemgetter
 
 log = logger.create()
 
+LD_JSON_MARKER = "application/ld+json"
+OG_URL_ITEM_ID = re.compile(r'property="og:url"\s+content="[^"]*ItemId=(\d+)')
+
+
+def isbn_language(isbn: str) -> str:
+    return "한국어" if is_korean(isbn) else "영어"
+
+
+def extract_json_ld(page: str) -> Optional[dict]:
+    """
+    Read the first ld+json block by scanning the raw page, without building a
+    document tree. Returns None when the block can't be found or decoded.
+    """
+    pos = page.find(LD_JSON_MARKER)
+    if pos < 0 or page.rfind("<script", 0, pos) < page.rfind(">", 0, pos):
+        return None
+    start = page.find(">", pos) + 1
+    end = page.find("</script>", start)
+    if start <= 0 or end < 0:
+        return None
+    try:
+        data = json.loads(page[start:end])
+    except ValueError:
+        return None
+    if isinstance(data, list):
+        data = next((item for item in data if isinstance(item, dict)), None)
+    return data if isinstance(data, dict) else None
+
 
-class Aladin(Metadata):
+def parse_json_ld(page: str) -> Optional[dict]:
+    long_soup = BS(page, "lxml")
+    script_tag = long_soup.find("script", attrs={"type": LD_JSON_MARKER})
+    if not script_tag:
+        return None
+    try:
+        data = json.loads(script_tag.string or script_tag.text)
+    except ValueError as e:
+        log.warning(e)
+        return None
+    if isinstance(data, list):
+        data = next((item for item in data if isinstance(item, dict)), None)
+    return data if isinstance(data, dict) else None
+
+
+class Aladin(BatchSearch, Metadata):
     __name__ = "Aladin"
     __id__ = "aladin"
+    MAX_WORKERS = 5
+    # 결과마다 TTB ItemLookUp 한 번으로 상세 정보를 받는다.
+    # 실패하면 상품 페이지와 getContents.aspx를 긁는다.
+    LOOKUP = True
+    # True면 상품 페이지에서 찾은 결과도 getContents.aspx를 받지 않고 돌려준다.
+    # 사용자가 고른 결과만 load_description()으로 책소개와 목차를 채운다.
+    # calibre-web은 검색 결과를 그대로 보여 주므로 기본값은 False이다.
+    LAZY_DESCRIPTION = False
+    # search_many: 검색 하나가 상품 페이지를 최대 5개 받으므로 적게 잡는다.
+    BATCH_WORKERS = 2
+    # 검색 한 번(검색 페이지 + 상품 페이지들)에 쓸 수 있는 시간(초)
+    SEARCH_TIMEOUT = 15
     headers = {
         "upgrade-insecure-requests": "1",
         "user-agent": "Mozilla/5.0 (X11; Linux x86_64; rv:130.0) Gecko/20100101 Firefox/130.0",
@@ -55,202 +159,424 @@ class Aladin(Metadata):
         "Referer": "https://www.aladin.co.kr/",
         "accept-language": "en-US,en;q=0.9",
     }
-    session = requests.Session()
-    session.headers = headers
+    # 검색 결과 1개당 상품 페이지와 getContents.aspx 요청이 동시에 나간다.
+    transport = PooledTransport(
+        headers=headers,
+        name="aladin",
+        pool_size=MAX_WORKERS * 2,
+        host_limits={"www.aladin.co.kr": MAX_WORKERS * 2, "image.aladin.co.kr": 4},
+    )
+    cache = get_cache("aladin")
+    # ItemLookUp도 TTB 키의 하루 호출 한도 안에서 쓴다.
+    quota = get_quota()
+    # 같은 페이지를 동시에 찾는 검색들은 요청 하나의 결과를 나눠 받는다.
+    inflight = SingleFlight(__id__)
+    # 상품 페이지는 검색마다 풀을 새로 만들지 않고 모든 검색이 같이 쓴다.
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=MAX_WORKERS * 2, thread_name_prefix="aladin"
+    )
+    # 결과마다 getContents.aspx 두 개를 병렬로 받는 데 쓴다.
+    fragments = concurrent.futures.ThreadPoolExecutor(
+        max_workers=MAX_WORKERS * 2, thread_name_prefix="aladin-contents"
+    )
+    PRODUCT_URL = "https://www.aladin.co.kr/shop/wproduct.aspx?ItemId="
+    PRODUCT_ISBN_URL = "https://www.aladin.co.kr/shop/wproduct.aspx?ISBN="
+    CONTENTS_URL = (
+        "https://www.aladin.co.kr/shop/product/getContents.aspx"
+        "?ISBN={isbn}&name={name}&type=0&date={hour}"
+    )
 
     def search(
         self, query: str, generic_cover: str = "", locale: str = "en"
     ) -> Optional[List[MetaRecord]]:
-        def inner(link_info, index) -> [dict, int]:
-            link, language = link_info
-            with self.session as session:
-                try:
-                    r = session.get(f"{link}")
-                    r.raise_for_status()
-                except Exception as ex:
-                    log.warning(ex)
-                    return []
-                long_soup = BS(r.text, "lxml")
-
-                script_tag = long_soup.findAll(
-                    "script", attrs={"type": "application/ld+json"}
-                )[0]
-
-                if script_tag:
-                    try:
-                        json_text = script_tag.string or script_tag.text
-                        data = json.loads(json_text)
-
-                        match = MetaRecord(
-                            id=link.split("ItemId=")[-1],
-                            title=data.get("name", "").replace(" (Paperback)", ""),
-                            authors=[
-                                item.strip()
-                                for item in data.get("author", {})
-                                .get("name", "")
-                                .split(",")
-                            ],
-                            source=MetaSourceInfo(
-                                id=self.__id__,
-                                description="Aladin Books",
-                                link="https://aladin.co.kr/",
-                            ),
-                            url=f"{link}",
-                            publisher=data.get("publisher", {}).get("name"),
-                            publishedDate=data.get("workExample", [{}])[0].get(
-                                "datePublished"
-                            ),
-                            tags=[
-                                item.strip()
-                                for item in data.get("genre", "").split(",")
-                            ],
-                            cover=data.get("image"),
-                            description=data.get("description"),
-                            languages=[language],
-                        )
-
-                        try:
-                            match.rating = (
-                                int(data.get("aggregateRating", {}).get("ratingValue"))
-                                / 2
-                            )
-                        except (AttributeError, TypeError, ValueError):
-                            match.rating = 0
-
-                        match.identifiers = {"aladin.co.kr": match.id}
-                        match.identifiers["isbn"] = data.get("workExample", [{}])[
-                            0
-                        ].get("isbn")
-
-                        # 소개 페이지 따로 하자
-                        match.description = (
-                            self._parse_description(match) or match.description
-                        )
-
-                        return match, index
-                    except Exception as e:
-                        log.error_or_exception(e)
-                        return []
-
-        val = list()
-        if self.active:
+        with phase(self.__id__, "search"):
+            result = list(self.search_iter(query, generic_cover, locale))
+        log_metrics()
+        return [x[1] for x in sorted(result, key=itemgetter(0))]
+
+    def search_iter(
+        self, query: str, generic_cover: str = "", locale: str = "en"
+    ) -> Iterator[Tuple[int, MetaRecord]]:
+        # 알라딘이 죽어 있어도(circuit open) 캐시에 있는 결과는 바로 돌려준다.
+        # 요청마다 transport가 circuit을 확인하므로 여기서는 available()을 보지 않는다.
+        if not self.active:
+            return
+        deadline = Deadline(self.SEARCH_TIMEOUT, self.__id__)
+        isbn = normalize_isbn(query)
+        key = isbn or miss_key(query)
+        # 얼마 전에 아무것도 못 찾은 검색어는 알라딘에 다시 묻지 않는다.
+        if self.cache.is_miss(self.__id__, key):
+            return
+        if isbn:
+            # ISBN이면 검색 페이지를 건너뛰고 상품 페이지로 바로 간다.
+            match = self._fetch_isbn(isbn, deadline)
+            if match:
+                yield 0, match
+                return
+        links_list = self._search_links(query, deadline)
+        if links_list is None:
+            return
+        if not links_list:
+            self.cache.add_miss(self.__id__, key)
+            return
+
+        fut = {
+            self.executor.submit(self._fetch_record, link, language, deadline): index
+            for index, (link, language) in enumerate(links_list[:5])
+        }
+        try:
+            # 느린 상품 페이지 하나 때문에 나머지 결과를 붙잡아 두지 않는다.
+            for future in concurrent.futures.as_completed(
+                fut, timeout=deadline.remaining()
+            ):
+                match = future.result()
+                if match:
+                    yield fut[future], match
+        except concurrent.futures.TimeoutError:
+            deadline.fire()
+            log.warning(
+                "Aladin search for %r exceeded %ss, returning partial results",
+                query,
+                self.SEARCH_TIMEOUT,
+            )
+        finally:
+            # 시간 안에 끝나지 못한 요청은 버린다.
+            # 이미 보낸 요청도 남은 시간만큼만 기다리므로 곧 끝난다.
+            for future in fut:
+                future.cancel()
+        log.debug(
+            "Aladin connections: %s, coalesced: %s",
+            self.transport.stats(),
+            self.inflight.stats(),
+        )
+
+    def _search_links(
+        self, query: str, deadline: Optional[Deadline] = None
+    ) -> Optional[List[Tuple[str, str]]]:
+        with phase(self.__id__, "search_page"):
+            return self._parse_search_links(query, deadline)
+
+    def _parse_search_links(
+        self, query: str, deadline: Optional[Deadline] = None
+    ) -> Optional[List[Tuple[str, str]]]:
+        # 검색 페이지를 못 받으면 None, 결과가 없으면 빈 목록
+        try:
+            results = self._get_text(
+                f"https://www.aladin.co.kr/search/wsearchresult.aspx?SearchTarget=All&SearchWord={query.replace(' ', '+')}",
+                deadline,
+            )
+        except requests.exceptions.HTTPError as e:
+            log.error_or_exception(e)
+            return None
+        except Exception as e:
+            log.warning(e)
+            return None
+        with phase(self.__id__, "parse_search_page"):
+            return self._parse_links(results)
+
+    @staticmethod
+    def _parse_links(results: str) -> List[Tuple[str, str]]:
+        soup = BS(results, "html.parser")
+
+        # List Comprehension은 보기가 너무 어렵다.
+        # links_list = [next(filter(lambda i: "wproduct" in i["href"], x.findAll("a", attrs={"class": "bo3"})), None)["href"] for x in
+        #              soup.findAll("div", attrs={"class": "ss_book_list"})]
+        links_list = []
+        for x in soup.findAll("div", attrs={"class": "ss_book_list"}):
+            span_tag = x.find("span", class_="tit_category")
+            if "도서" not in (span_tag.get_text(strip=True) if span_tag else ""):
+                continue
+
+            language = (
+                "영어"
+                if "외국" in (span_tag.get_text(strip=True) if span_tag else "")
+                else "한국어"
+            )
+
+            a_tags = x.findAll("a", attrs={"class": "bo3"})
+            link_tag = next(
+                (i for i in a_tags if "wproduct" in i.get("href", "")), None
+            )
+            if link_tag:
+                links_list.append(
+                    (link_tag["href"], language)
+                )  # 언어를 여기서 찾아서 보내야겠다.
+        return links_list
+
+    def _fetch_isbn(self, isbn: str, deadline: Deadline) -> Optional[MetaRecord]:
+        item_id = self.cache.get_mapping("isbn", isbn)
+        if item_id:
+            link = self.PRODUCT_URL + item_id
+        else:
+            link = self.PRODUCT_ISBN_URL + isbn
+        return self._fetch_record(link, isbn_language(isbn), deadline)
+
+    def _fetch_record(
+        self, link: str, language: str, deadline: Optional[Deadline] = None
+    ) -> Optional[MetaRecord]:
+        if self.LOOKUP:
+            match = self._lookup_record(link, language, deadline)
+            if match is not None:
+                return match
+            # 시간이 다 됐으면 상품 페이지를 받아 봐야 결과에 들어가지 못한다.
+            if deadline is not None and deadline.expired:
+                return None
+        with phase(self.__id__, "product_page"):
             try:
-                results = self.session.get(
-                    f"https://www.aladin.co.kr/search/wsearchresult.aspx?SearchTarget=All&SearchWord={query.replace(' ', '+')}",
-                    headers=self.headers,
-                )
+                text = self._get_text(f"{link}", deadline)
+            except Exception as ex:
+                log.warning(ex)
+                return None
+            with phase(self.__id__, "parse_product"):
+                match = self._parse_record(link, language, text)
+            if match is None or self.LAZY_DESCRIPTION:
+                return match
+            # 소개 페이지 따로 하자
+            # calibre-web은 검색 결과를 그대로 보여 주므로 책소개와 목차도 여기서 받는다.
+            return self.load_description(match, deadline)
 
-                results.raise_for_status()
-            except requests.exceptions.HTTPError as e:
-                log.error_or_exception(e)
-                return []
-            except Exception as e:
-                log.warning(e)
-                return []
-            soup = BS(results.text, "html.parser")
-
-            # List Comprehension은 보기가 너무 어렵다.
-            # links_list = [next(filter(lambda i: "wproduct" in i["href"], x.findAll("a", attrs={"class": "bo3"})), None)["href"] for x in
-            #              soup.findAll("div", attrs={"class": "ss_book_list"})]
-            links_list = []
-            for x in soup.findAll("div", attrs={"class": "ss_book_list"}):
-                span_tag = x.find("span", class_="tit_category")
-                if "도서" not in (span_tag.get_text(strip=True) if span_tag else ""):
-                    continue
-
-                language = (
-                    "영어"
-                    if "외국" in (span_tag.get_text(strip=True) if span_tag else "")
-                    else "한국어"
+    def _lookup_record(
+        self, link: str, language: str, deadline: Optional[Deadline] = None
+    ) -> Optional[MetaRecord]:
+        params = parse_qs(urlsplit(link).query)
+        item_id = params.get("ItemId", [None])[0]
+        isbn = params.get("ISBN", [None])[0]
+        if not item_id and not isbn:
+            return None
+        url = lookup_url(item_id=item_id, isbn=isbn)
+        with phase(self.__id__, "lookup"):
+            try:
+                item = lookup_item(
+                    url, self.transport, self.cache, self.quota, deadline
                 )
+            except Exception as ex:
+                log.warning("ItemLookUp failed: %s", redact(ex))
+                return None
+        if not item:
+            return None
+        with phase(self.__id__, "parse_lookup"):
+            return self._parse_item(item, language)
 
-                a_tags = x.findAll("a", attrs={"class": "bo3"})
-                link_tag = next(
-                    (i for i in a_tags if "wproduct" in i.get("href", "")), None
-                )
-                if link_tag:
-                    links_list.append(
-                        (link_tag["href"], language)
-                    )  # 언어를 여기서 찾아서 보내야겠다.
-
-            with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-                fut = {
-                    executor.submit(inner, link_info, index)
-                    for index, link_info in enumerate(links_list[:5])
-                }
-                val = list(
-                    map(lambda x: x.result(), concurrent.futures.as_completed(fut))
-                )
-        result = list(filter(lambda x: x, val))
+    def _parse_item(self, item: dict, language: str) -> MetaRecord:
+        item_id = str(item["itemId"])
+        match = MetaRecord(
+            id=item_id,
+            title=item.get("title", "").replace(" (Paperback)", ""),
+            authors=item_authors(item),
+            source=MetaSourceInfo(
+                id=self.__id__,
+                description="Aladin Books",
+                link="https://aladin.co.kr/",
+            ),
+            url=self.PRODUCT_URL + item_id,
+            publisher=item.get("publisher"),
+            publishedDate=item.get("pubDate"),
+            tags=[tag.strip() for tag in item.get("categoryName", "").split(",")],
+            cover=cover_url(item),
+            description=item_description(item),
+            languages=[language],
+        )
+        try:
+            match.rating = int(item.get("customerReviewRank")) / 2
+        except (TypeError, ValueError):
+            match.rating = 0
+        match.identifiers = {"aladin.co.kr": match.id}
+        match.identifiers["isbn"] = item.get("isbn13") or item.get("isbn")
+        if match.identifiers["isbn"]:
+            self.cache.set_mapping("isbn", match.identifiers["isbn"], match.id)
+        return match
+
+    def _parse_record(
+        self, link: str, language: str, text: str
+    ) -> Optional[MetaRecord]:
+        data = extract_json_ld(text)
+        if data is None:
+            # 빠른 경로가 실패했을 때만 페이지 전체를 파싱한다.
+            data = parse_json_ld(text)
+        if not data:
+            return None
+        if "ItemId=" in link:
+            item_id = link.split("ItemId=")[-1]
+        else:
+            item_id = OG_URL_ITEM_ID.search(text)
+            if not item_id:
+                return None
+            item_id = item_id.group(1)
+            link = self.PRODUCT_URL + item_id
 
-        return [x[0] for x in sorted(result, key=itemgetter(1))]
+        try:
+            match = MetaRecord(
+                id=item_id,
+                title=data.get("name", "").replace(" (Paperback)", ""),
+                authors=[
+                    item.strip()
+                    for item in data.get("author", {}).get("name", "").split(",")
+                ],
+                source=MetaSourceInfo(
+                    id=self.__id__,
+                    description="Aladin Books",
+                    link="https://aladin.co.kr/",
+                ),
+                url=f"{link}",
+                publisher=data.get("publisher", {}).get("name"),
+                publishedDate=data.get("workExample", [{}])[0].get("datePublished"),
+                tags=[item.strip() for item in data.get("genre", "").split(",")],
+                cover=data.get("image"),
+                description=data.get("description"),
+                languages=[language],
+            )
 
-    def _parse_description(self, match) -> str:
-        isbn = match.identifiers["isbn"]
-        with self.session as session:
-            # 책소개 (PublisherDesc)
             try:
-                r = session.get(
-                    f"http://www.aladin.co.kr/shop/product/getContents.aspx"
-                    f"?ISBN={isbn}&name=PublisherDesc&type=0&date={datetime.now().hour}"
+                match.rating = (
+                    int(data.get("aggregateRating", {}).get("ratingValue")) / 2
                 )
-                r.raise_for_status()
-            except Exception as ex:
-                log.warning(ex)
-                return []
-            soup = BS(r.text, "html.parser")
-            introduce_text = ""
-            boxes = soup.find_all("div", class_="Ere_prod_mconts_R")
-            for box in boxes:
+            except (AttributeError, TypeError, ValueError):
+                match.rating = 0
+
+            match.identifiers = {"aladin.co.kr": match.id}
+            match.identifiers["isbn"] = data.get("workExample", [{}])[0].get("isbn")
+            if match.identifiers["isbn"]:
+                self.cache.set_mapping("isbn", match.identifiers["isbn"], match.id)
+            return match
+        except Exception as e:
+            log.error_or_exception(e)
+            return None
+
+    def _get_text(self, url: str, deadline: Optional[Deadline] = None) -> str:
+        return self.inflight.do(
+            canonical_url(url),
+            self._fetch_text,
+            url,
+            deadline,
+            timeout=deadline.remaining() if deadline else None,
+        )
+
+    def _fetch_text(self, url: str, deadline: Optional[Deadline] = None) -> str:
+        # 캐시에 있으면 알라딘에 다시 요청하지 않는다.
+        text = self.cache.get(url)
+        if text is not None:
+            return text
+        try:
+            r = self.transport.get(url, deadline=deadline)
+        except CircuitOpen:
+            # 유효기간이 지난 캐시라도 빈 결과보다 낫다.
+            text = self.cache.get(url, stale=True)
+            if text is None:
+                raise
+            return text
+        r.raise_for_status()
+        self.cache.set(url, r.text)
+        return r.text
+
+    def available(self) -> bool:
+        return self.transport.available()
+
+    def load_description(
+        self, match: MetaRecord, deadline: Optional[Deadline] = None
+    ) -> MetaRecord:
+        """
+        Replace the short ld+json description of a search result with the
+        full description and table of contents (see LAZY_DESCRIPTION).
+        """
+        match.description = self.get_description(
+            match.identifiers, match.description or "", deadline
+        )
+        return match
+
+    def get_description(
+        self, identifiers: dict, fallback: str = "", deadline: Optional[Deadline] = None
+    ) -> str:
+        isbn = identifiers.get("isbn")
+        if not isbn:
+            return fallback
+        return self._parse_description(isbn, fallback, deadline)
+
+    def _parse_description(
+        self, isbn: str, fallback: str = "", deadline: Optional[Deadline] = None
+    ) -> str:
+        # ISBN이 같은 결과는 책소개와 목차를 한 번만 파싱한다.
+        with phase(self.__id__, "description"):
+            introduce_text, toc_text = self.inflight.do(
+                "contents:" + isbn, self._parse_contents, isbn, deadline
+            )
+        introduce_text = introduce_text or fallback
+        if not toc_text:
+            return introduce_text
+        return introduce_text + "<br/>" + toc_text
+
+    def _parse_contents(
+        self, isbn: str, deadline: Optional[Deadline] = None
+    ) -> Tuple[str, str]:
+        # 책소개와 목차를 동시에 받는다. 하나가 실패해도 나머지는 살린다.
+        introduce = self.fragments.submit(self._parse_publisher_desc, isbn, deadline)
+        toc = self.fragments.submit(self._parse_toc, isbn, deadline)
+        return introduce.result(), toc.result()
+
+    def _get_contents(
+        self, isbn: str, name: str, deadline: Optional[Deadline] = None
+    ) -> Optional[BS]:
+        try:
+            text = self._get_text(
+                self.CONTENTS_URL.format(
+                    isbn=isbn, name=name, hour=datetime.now().hour
+                ),
+                deadline,
+            )
+        except Exception as ex:
+            log.warning(ex)
+            return None
+        with phase(self.__id__, "parse_contents"):
+            return BS(text, "html.parser")
+
+    def _parse_publisher_desc(
+        self, isbn: str, deadline: Optional[Deadline] = None
+    ) -> str:
+        # 책소개 (PublisherDesc)
+        soup = self._get_contents(isbn, "PublisherDesc", deadline)
+        if soup is None:
+            return ""
+        introduce_text = ""
+        boxes = soup.find_all("div", class_="Ere_prod_mconts_R")
+        for box in boxes:
+            introduce_text = " ".join(
+                div.decode_contents()
+                for div in box.find_all("div", id="div_PublisherDesc_All")
+            )
+            if not introduce_text:
                 introduce_text = " ".join(
                     div.decode_contents()
-                    for div in box.find_all("div", id="div_PublisherDesc_All")
-                )
-                if not introduce_text:
-                    introduce_text = " ".join(
-                        div.decode_contents()
-                        for div in box.find_all(
-                            "div",
-                            attrs={
-                                "style": lambda s: s and "word-break:break-all" in s
-                            },
-                        )
+                    for div in box.find_all(
+                        "div",
+                        attrs={"style": lambda s: s and "word-break:break-all" in s},
                     )
+                )
 
-                if introduce_text:
-                    break
+            if introduce_text:
+                break
+        return introduce_text
 
-            # 목차 (Introduce)
-            try:
-                r2 = session.get(
-                    f"http://www.aladin.co.kr/shop/product/getContents.aspx"
-                    f"?ISBN={isbn}&name=Introduce&type=0&date={datetime.now().hour}"
-                )
-                r2.raise_for_status()
-            except Exception as ex:
-                log.warning(ex)
-                return []
-            soup2 = BS(r2.text, "html.parser")
-            toc_text = ""
-            boxes = soup2.find_all("div", class_="Ere_prod_mconts_box")
+    def _parse_toc(self, isbn: str, deadline: Optional[Deadline] = None) -> str:
+        # 목차 (Introduce)
+        soup2 = self._get_contents(isbn, "Introduce", deadline)
+        if soup2 is None:
+            return ""
+        toc_text = ""
+        boxes = soup2.find_all("div", class_="Ere_prod_mconts_box")
+        for box in boxes:
+            toc_text = " ".join(
+                div.decode_contents() for div in box.find_all("div", id="div_TOC_All")
+            )
+            if toc_text:
+                break
+        if not toc_text:
             for box in boxes:
                 toc_text = " ".join(
                     div.decode_contents()
-                    for div in box.find_all("div", id="div_TOC_All")
+                    for div in box.find_all("div", id="div_TOC_Short")
                 )
                 if toc_text:
                     break
-            if not toc_text:
-                boxes = soup2.find_all("div", class_="Ere_prod_mconts_box")
-                for box in boxes:
-                    toc_text = " ".join(
-                        div.decode_contents()
-                        for div in box.find_all("div", id="div_TOC_Short")
-                    )
-                    if toc_text:
-                        break
-            description = introduce_text + "<br/>" + toc_text
-        return description
+        return toc_text
 
 
 if __name__ == "__main__":
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+#  This file is part of the Calibre-Web (https://github.com/janeczku/calibre-web)
+#    Copyright (C) 2024 leechis7
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+Helpers shared by the Aladin metadata providers. The package is installed
+next to them, in calibre-web's cps/metadata_provider, and only relies on
+what calibre-web itself ships (cps.constants, cps.logger).
+"""
+
+from .batch import BatchSearch
+from .circuit_breaker import CircuitOpen
+from .http_cache import canonical_url, get_cache, miss_key
+from .isbn import is_korean, normalize_isbn, to_isbn13
+from .metrics import log_metrics, phase
+from .singleflight import SingleFlight
+from .transport import Deadline, PooledTransport
+from .ttb import (
+    BULK_RESERVE,
+    TTB_KEY,
+    QuotaExceeded,
+    cover_url,
+    get_quota,
+    item_authors,
+    item_description,
+    lookup_item,
+    lookup_url,
+    parse_item,
+    redact,
+)
+
+__all__ = [
+    "BULK_RESERVE",
+    "TTB_KEY",
+    "BatchSearch",
+    "CircuitOpen",
+    "Deadline",
+    "PooledTransport",
+    "QuotaExceeded",
+    "SingleFlight",
+    "canonical_url",
+    "cover_url",
+    "get_cache",
+    "get_quota",
+    "is_korean",
+    "item_authors",
+    "item_description",
+    "log_metrics",
+    "lookup_item",
+    "lookup_url",
+    "miss_key",
+    "normalize_isbn",
+    "parse_item",
+    "phase",
+    "redact",
+    "to_isbn13",
+]
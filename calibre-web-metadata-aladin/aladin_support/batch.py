@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+#  This file is part of the Calibre-Web (https://github.com/janeczku/calibre-web)
+#    Copyright (C) 2024 leechis7
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <http://www.gnu.org/licenses/>.
+import concurrent.futures
+import threading
+from typing import Iterable, Iterator, List, Tuple
+
+from cps import logger
+
+log = logger.create()
+
+# Worker threads of the pool shared by the search_many calls of all providers
+BATCH_POOL_SIZE = 4
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+
+
+def batch_pool() -> concurrent.futures.ThreadPoolExecutor:
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            _batch_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=BATCH_POOL_SIZE, thread_name_prefix="metadata-batch"
+            )
+        return _batch_pool
+
+
+class BatchSearch:
+    """
+    Mixin adding search_many to a Metadata provider. It is not a Metadata
+    subclass itself, so calibre-web never takes it for a provider.
+    """
+
+    # queries of one search_many call running at the same time
+    BATCH_WORKERS = BATCH_POOL_SIZE
+
+    def search_many(
+        self, queries: Iterable[str], generic_cover: str = "", locale: str = "en"
+    ) -> Iterator[Tuple[int, List]]:
+        """
+        Search a batch of queries, e.g. for a bulk refresh of the library.
+        Yields (index of the query, records) as each query completes. At most
+        BATCH_WORKERS queries run at once, on the pool shared by all providers;
+        the rest are only submitted as earlier ones finish.
+        """
+        pool = batch_pool()
+        queries = enumerate(queries)
+        pending = {}
+
+        def submit_next():
+            for index, query in queries:
+                pending[pool.submit(self.search, query, generic_cover, locale)] = index
+                return
+
+        for _ in range(max(self.BATCH_WORKERS, 1)):
+            submit_next()
+        try:
+            while pending:
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    index = pending.pop(future)
+                    try:
+                        records = future.result() or []
+                    except Exception as ex:
+                        log.warning("%s: query %s failed: %s", self.__name__, index, ex)
+                        records = []
+                    submit_next()
+                    yield index, records
+        finally:
+            for future in pending:
+                future.cancel()
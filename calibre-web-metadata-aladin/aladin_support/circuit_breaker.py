@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+#  This file is part of the Calibre-Web (https://github.com/janeczku/calibre-web)
+#    Copyright (C) 2024 leechis7
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <http://www.gnu.org/licenses/>.
+import threading
+import time
+from typing import Callable, Dict, Optional, Union
+
+import requests
+
+from cps import logger
+
+log = logger.create()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# consecutive failed (or slow) requests which open the circuit
+DEFAULT_FAILURE_THRESHOLD = 5
+# a response slower than this (seconds) counts as a failure
+DEFAULT_SLOW_CALL = 8.0
+# seconds the circuit stays open before a probe request is let through
+DEFAULT_RESET_TIMEOUT = 30.0
+
+
+class CircuitOpen(requests.exceptions.ConnectionError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a host which keeps failing.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    requests are refused at once. After ``reset_timeout`` seconds it turns
+    half-open and lets ``probes`` requests through; it closes again if they
+    succeed and reopens if not.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        slow_call: float = DEFAULT_SLOW_CALL,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+        probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self._clock = clock
+        self.failure_threshold = failure_threshold
+        self.slow_call = slow_call
+        self.reset_timeout = reset_timeout
+        self.probes = probes
+        self.failures = 0
+        self.opened = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = 0
+        self._lock = threading.Lock()
+
+    def _current_state(self) -> str:
+        if (
+            self._state == OPEN
+            and self._clock() - self._opened_at >= self.reset_timeout
+        ):
+            self._state = HALF_OPEN
+            self._probing = 0
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; must be followed by record()"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probing < self.probes:
+                self._probing += 1
+                return True
+            return False
+
+    def record(self, ok: Optional[bool], latency: float = 0.0) -> None:
+        """
+        Outcome of an allowed request: True, False, or None when it never
+        reached the host (e.g. the caller ran out of time first).
+        """
+        if ok and latency > self.slow_call:
+            ok = False
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                self._probing = max(self._probing - 1, 0)
+            if ok is None:
+                return
+            if ok:
+                if state != CLOSED:
+                    log.info("%s: circuit closed", self.name)
+                self._state = CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if state != OPEN:
+                    log.warning(
+                        "%s: circuit open after %s failures, retrying in %ss",
+                        self.name,
+                        self.failures,
+                        self.reset_timeout,
+                    )
+                    self.opened += 1
+                self._state = OPEN
+                self._opened_at = self._clock()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self.failures = 0
+            self._probing = 0
+
+    def stats(self) -> Dict[str, Union[str, int]]:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "failures": self.failures,
+                "opened": self.opened,
+            }
@@ -0,0 +1,445 @@
+# -*- coding: utf-8 -*-
+
+#  This file is part of the Calibre-Web (https://github.com/janeczku/calibre-web)
+#    Copyright (C) 2024 leechis7
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <http://www.gnu.org/licenses/>.
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from cps import constants, logger
+from . import metrics
+
+log = logger.create()
+
+# Seconds a cached page stays fresh, per page type
+DEFAULT_TTLS = {
+    "search": 60 * 60,  # wsearchresult.aspx
+    "product": 24 * 60 * 60,  # wproduct.aspx
+    "contents": 7 * 24 * 60 * 60,  # getContents.aspx (책소개, 목차)
+    "api": 60 * 60,  # ttb/api/*.aspx
+    "other": 60 * 60,
+}
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# identifiers (ISBN -> ItemId, ...) change far less often than pages
+DEFAULT_MAPPING_TTL = 30 * 24 * 60 * 60
+
+# searches which found nothing are retried after this long, the catalogue grows
+DEFAULT_MISS_TTL = 6 * 60 * 60
+DEFAULT_MAX_MISSES = 20000
+
+# Reads only move an entry up the LRU order when its last recorded access is
+# older than this, and the new access times are written in batches
+ACCESS_RESOLUTION = 60
+ACCESS_BATCH = 64
+
+# Query parameters which only bust the upstream cache (getContents.aspx?date=<hour>)
+VOLATILE_PARAMS = frozenset(["date"])
+
+
+def canonical_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = "https" if parts.scheme in ("http", "https", "") else parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if netloc == "aladin.co.kr":
+        netloc = "www.aladin.co.kr"
+    query = sorted(
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in VOLATILE_PARAMS
+    )
+    return urlunsplit((scheme, netloc, parts.path, urlencode(query), ""))
+
+
+def miss_key(query: str) -> str:
+    """Key of a search in the negative cache: case and spacing don't matter"""
+    return " ".join(query.lower().split())
+
+
+class BloomFilter:
+    """
+    Fixed size Bloom filter of strings. ``might_contain`` is never wrong
+    about absent keys, and wrong about present ones at ``error_rate``.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def might_contain(self, key: str) -> bool:
+        return all(
+            self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key)
+        )
+
+
+def page_kind(url: str) -> str:
+    path = urlsplit(url).path.lower()
+    if path.endswith("wsearchresult.aspx"):
+        return "search"
+    if path.endswith("wproduct.aspx"):
+        return "product"
+    if path.endswith("getcontents.aspx"):
+        return "contents"
+    if "/ttb/api/" in path:
+        return "api"
+    return "other"
+
+
+class ResponseCache:
+    """
+    Size bounded LRU cache of response bodies, stored in a SQLite database
+    and keyed by canonical URL.
+
+    The same database keeps identifier mappings and a negative cache of
+    searches which found nothing. With ``miss_filter`` a Bloom filter of the
+    negative cache is kept in memory, so most searches never touch the
+    database to learn that they are not a known miss.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttls: Optional[Dict[str, int]] = None,
+        miss_ttl: int = DEFAULT_MISS_TTL,
+        max_misses: int = DEFAULT_MAX_MISSES,
+        miss_filter: bool = True,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self._clock = clock
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.miss_ttl = miss_ttl
+        self.max_misses = max_misses
+        self.miss_filter = miss_filter
+        self.negative_hits = 0
+        self._misses = 0
+        self._bloom: Optional[BloomFilter] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._size = 0
+        self._disabled = False
+        # key -> access time not written to the database yet
+        self._accessed: Dict[str, float] = {}
+        self._accessed_flushed = self._clock()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and not self._disabled:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                # a crash may lose the last commits, but never corrupts the cache
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, kind TEXT, body TEXT, size INTEGER, "
+                    "stored REAL, accessed REAL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS mappings ("
+                    "namespace TEXT, key TEXT, value TEXT, stored REAL, "
+                    "PRIMARY KEY (namespace, key))"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS misses ("
+                    "namespace TEXT, key TEXT, stored REAL, "
+                    "PRIMARY KEY (namespace, key))"
+                )
+                conn.commit()
+                self._size = conn.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()[0]
+                self._conn = conn
+                self._load_misses()
+            except (OSError, sqlite3.Error) as ex:
+                log.warning("Metadata cache disabled, %s: %s", self.path, ex)
+                self._disabled = True
+        return self._conn
+
+    def get(self, url: str, stale: bool = False) -> Optional[str]:
+        """Fresh body of url, or with stale any stored one (e.g. while the site is down)"""
+        kind = page_kind(url)
+        ttl = self.ttls.get(kind, 0)
+        with self._lock:
+            conn = self._connect() if ttl > 0 else None
+            if conn is None:
+                self.misses += 1
+                return None
+            key = canonical_url(url)
+            now = self._clock()
+            try:
+                row = conn.execute(
+                    "SELECT body, stored, accessed FROM responses WHERE key = ?",
+                    (key,),
+                ).fetchone()
+            except sqlite3.Error as ex:
+                log.warning(ex)
+                row = None
+            if row is None or (now - row[1] > ttl and not stale):
+                self.misses += 1
+                return None
+            self.hits += 1
+            if now - row[2] >= ACCESS_RESOLUTION:
+                self._accessed[key] = now
+            if len(self._accessed) >= ACCESS_BATCH or (
+                self._accessed and now - self._accessed_flushed >= ACCESS_RESOLUTION
+            ):
+                try:
+                    self._flush_accessed(conn)
+                    conn.commit()
+                except sqlite3.Error as ex:
+                    log.warning(ex)
+            return row[0]
+
+    def set(self, url: str, body: str) -> None:
+        kind = page_kind(url)
+        if self.ttls.get(kind, 0) <= 0 or not body:
+            return
+        size = len(body.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            key = canonical_url(url)
+            now = self._clock()
+            try:
+                old = conn.execute(
+                    "SELECT size FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, kind, body, size, now, now),
+                )
+                self._size += size - (old[0] if old else 0)
+                self._accessed.pop(key, None)
+                # evict by the access times of recent reads too
+                self._flush_accessed(conn)
+                self._evict(conn)
+                conn.commit()
+            except sqlite3.Error as ex:
+                log.warning(ex)
+
+    def _flush_accessed(self, conn: sqlite3.Connection) -> None:
+        if self._accessed:
+            conn.executemany(
+                "UPDATE responses SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._accessed.items()],
+            )
+            self._accessed.clear()
+        self._accessed_flushed = self._clock()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        while self._size > self.max_bytes:
+            rows = conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed LIMIT 16"
+            ).fetchall()
+            if not rows:
+                self._size = 0
+                return
+            for key, size in rows:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= size
+                self.evictions += 1
+                if self._size <= self.max_bytes:
+                    return
+
+    def get_mapping(
+        self, namespace: str, key: str, ttl: int = DEFAULT_MAPPING_TTL
+    ) -> Optional[str]:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT value, stored FROM mappings WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                ).fetchone()
+            except sqlite3.Error as ex:
+                log.warning(ex)
+                return None
+        if row is None or self._clock() - row[1] > ttl:
+            return None
+        return row[0]
+
+    def set_mapping(self, namespace: str, key: str, value: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO mappings VALUES (?, ?, ?, ?)",
+                    (namespace, key, value, self._clock()),
+                )
+                conn.commit()
+            except sqlite3.Error as ex:
+                log.warning(ex)
+
+    def _load_misses(self) -> None:
+        # drop expired misses and rebuild the filter from the rest
+        conn = self._conn
+        conn.execute(
+            "DELETE FROM misses WHERE stored < ?", (self._clock() - self.miss_ttl,)
+        )
+        conn.commit()
+        rows = conn.execute("SELECT namespace, key FROM misses").fetchall()
+        self._misses = len(rows)
+        self._bloom = None
+        if self.miss_filter:
+            self._bloom = BloomFilter(max(self.max_misses, len(rows)) * 2)
+            for namespace, key in rows:
+                self._bloom.add(namespace + "\0" + key)
+
+    def is_miss(self, namespace: str, key: str) -> bool:
+        """Whether a search for key found nothing less than miss_ttl ago"""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return False
+            if self._bloom is not None and not self._bloom.might_contain(
+                namespace + "\0" + key
+            ):
+                return False
+            try:
+                row = conn.execute(
+                    "SELECT stored FROM misses WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                ).fetchone()
+            except sqlite3.Error as ex:
+                log.warning(ex)
+                return False
+            if row is None or self._clock() - row[0] > self.miss_ttl:
+                return False
+            self.negative_hits += 1
+            return True
+
+    def add_miss(self, namespace: str, key: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO misses VALUES (?, ?, ?)",
+                    (namespace, key, self._clock()),
+                )
+                self._misses += 1
+                if self._misses > self.max_misses:
+                    # replaced keys were counted too, recount before evicting
+                    self._misses = conn.execute(
+                        "SELECT COUNT(*) FROM misses"
+                    ).fetchone()[0]
+                if self._misses > self.max_misses:
+                    conn.execute(
+                        "DELETE FROM misses WHERE rowid IN (SELECT rowid FROM misses "
+                        "ORDER BY stored LIMIT ?)",
+                        (self._misses - self.max_misses,),
+                    )
+                    self._misses = self.max_misses
+                conn.commit()
+            except sqlite3.Error as ex:
+                log.warning(ex)
+                return
+            if self._bloom is not None:
+                self._bloom.add(namespace + "\0" + key)
+                if self._bloom.count > self._bloom.capacity:
+                    self._load_misses()
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            if conn is not None:
+                conn.execute("DELETE FROM responses")
+                self._accessed.clear()
+                conn.execute("DELETE FROM mappings")
+                conn.execute("DELETE FROM misses")
+                conn.commit()
+                self._size = 0
+                self._load_misses()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes": self._size,
+                "negative_hits": self.negative_hits,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def _collect_metrics():
+    with _caches_lock:
+        caches = list(_caches.items())
+    for name, cache in caches:
+        stats = cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        labels = {"cache": name}
+        yield "metadata_cache_hits_total", "counter", labels, stats["hits"]
+        yield "metadata_cache_misses_total", "counter", labels, stats["misses"]
+        yield "metadata_cache_hit_ratio", "gauge", labels, (
+            stats["hits"] / lookups if lookups else 0.0
+        )
+        yield "metadata_cache_bytes", "gauge", labels, stats["bytes"]
+        yield "metadata_negative_cache_hits_total", "counter", labels, stats[
+            "negative_hits"
+        ]
+
+
+metrics.REGISTRY.add_collector(_collect_metrics)
+
+
+def get_cache(name: str = "aladin") -> ResponseCache:
+    """Process wide cache instance stored under CACHE_DIR/metadata/<name>.db"""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = ResponseCache(
+                os.path.join(constants.CACHE_DIR, "metadata", name + ".db")
+            )
+        return _caches[name]
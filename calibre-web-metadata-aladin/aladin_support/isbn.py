@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+#  This file is part of the Calibre-Web (https://github.com/janeczku/calibre-web)
+#    Copyright (C) 2024 leechis7
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <http://www.gnu.org/licenses/>.
+import re
+from typing import Optional
+
+
+def normalize_isbn(query: str) -> Optional[str]:
+    """The query as a bare ISBN-10/13 if it is one (checksum included), else None"""
+    isbn = re.sub(r"[\s-]", "", query.strip()).upper()
+    if isbn.startswith("ISBN"):
+        isbn = isbn[4:].lstrip(":")
+    if re.fullmatch(r"\d{9}[\dX]", isbn):
+        total = sum((10 - i) * (10 if c == "X" else int(c)) for i, c in enumerate(isbn))
+        return isbn if total % 11 == 0 else None
+    if re.fullmatch(r"97[89]\d{10}", isbn):
+        total = sum((3 if i % 2 else 1) * int(c) for i, c in enumerate(isbn))
+        return isbn if total % 10 == 0 else None
+    return None
+
+
+def to_isbn13(isbn: str) -> str:
+    """ISBN-13 of a normalized ISBN-10 (978 prefix); ISBN-13s are returned as is"""
+    if len(isbn) == 13:
+        return isbn
+    body = "978" + isbn[:9]
+    total = sum((3 if i % 2 else 1) * int(c) for i, c in enumerate(body))
+    return body + str(-total % 10)
+
+
+def is_korean(isbn: str) -> bool:
+    # 978-89 and 979-11 are the registration groups of Korean publishers
+    return isbn.startswith(("97889", "97911")) or (
+        len(isbn) == 10 and isbn.startswith("89")
+    )
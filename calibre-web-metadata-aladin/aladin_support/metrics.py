@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+
+#  This file is part of the Calibre-Web (https://github.com/janeczku/calibre-web)
+#    Copyright (C) 2024 leechis7
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <http://www.gnu.org/licenses/>.
+# Metrics of the metadata providers, kept in the calibre-web process.
+# calibre-web has no place for them, so they are written to the debug log
+# every LOG_INTERVAL seconds while searches run (log_metrics). Code running
+# in the process, e.g. a route added to calibre-web, can export them with
+# prometheus_text() or snapshot().
+import bisect
+import contextlib
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from cps import logger
+
+log = logger.create()
+
+# seconds between two dumps of the metrics to the debug log, 0 turns them off
+LOG_INTERVAL = 300.0
+
+# seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "metadata_phase_seconds": "Time spent in each phase of a metadata search",
+    "metadata_http_request_seconds": "Time of HTTP requests to the metadata site, by page kind",
+    "metadata_http_requests_total": "HTTP requests to the metadata site, by page kind and status",
+    "metadata_http_response_bytes_total": "Bytes downloaded from the metadata site, by page kind",
+    "metadata_cache_hits_total": "Response cache lookups answered from the cache",
+    "metadata_cache_misses_total": "Response cache lookups which went to the site",
+    "metadata_cache_hit_ratio": "Share of response cache lookups answered from the cache",
+    "metadata_cache_bytes": "Size of the cached response bodies",
+    "metadata_negative_cache_hits_total": "Searches skipped because they found nothing recently",
+    "metadata_ttb_quota_used": "TTB API calls made today with the key",
+    "metadata_ttb_quota_limit": "TTB API calls allowed per day with the key",
+    "metadata_singleflight_calls_total": "Calls made by the single-flight groups",
+    "metadata_singleflight_coalesced_total": "Calls which waited for an identical call in flight",
+    "metadata_deadline_fired_total": "Searches which ran out of time and returned partial results",
+    "metadata_circuit_state": "Circuit breaker state per host: 0 closed, 1 half-open, 2 open",
+    "metadata_circuit_opens_total": "Times the circuit breaker of a host opened",
+    "metadata_rate_limit_throttled_total": "Throttled (429/503) answers, by rate limit bucket",
+    "metadata_rate_limit_rate": "Current requests per second allowed, by rate limit bucket",
+    "metadata_rate_limit_paused_seconds": "Seconds left until a throttled bucket sends again",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+# (name, type, labels, value) reported by a collector at export time
+Sample = Tuple[str, str, Dict[str, str], float]
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return result
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    text = ",".join(
+        '%s="%s"' % (key, value.replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in labels
+    )
+    return "{%s}" % text if text else ""
+
+
+class Registry:
+    """
+    In-process histograms and counters, exported as Prometheus text
+    (prometheus_text) or as a JSON-serializable snapshot.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    @contextlib.contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """collector() is called at every export and returns (name, type, labels, value)"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def _collect(self) -> List[Sample]:
+        samples = []
+        for collector in list(self._collectors):
+            samples.extend(collector())
+        return samples
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(key),
+                        "count": hist.count,
+                        "sum": hist.sum,
+                        "buckets": dict(hist.cumulative()),
+                    }
+                    for key, hist in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+            counters = {
+                name: [
+                    {"labels": dict(key), "value": value}
+                    for key, value in series.items()
+                ]
+                for name, series in self._counters.items()
+            }
+        gauges = {}
+        for name, kind, labels, value in self._collect():
+            target = counters if kind == "counter" else gauges
+            target.setdefault(name, []).append({"labels": labels, "value": value})
+        return {"histograms": histograms, "counters": counters, "gauges": gauges}
+
+    def prometheus_text(self) -> str:
+        lines = []
+
+        def header(name, kind):
+            if name in HELP:
+                lines.append("# HELP %s %s" % (name, HELP[name]))
+            lines.append("# TYPE %s %s" % (name, kind))
+
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                header(name, "histogram")
+                for key, hist in series.items():
+                    for bound, count in hist.cumulative():
+                        labels = _format_labels(key + (("le", bound),))
+                        lines.append("%s_bucket%s %d" % (name, labels, count))
+                    lines.append(
+                        "%s_sum%s %s" % (name, _format_labels(key), repr(hist.sum))
+                    )
+                    lines.append(
+                        "%s_count%s %d" % (name, _format_labels(key), hist.count)
+                    )
+            for name, series in sorted(self._counters.items()):
+                header(name, "counter")
+                for key, value in series.items():
+                    lines.append("%s%s %s" % (name, _format_labels(key), repr(value)))
+        collected: Dict[Tuple[str, str], List[Tuple[Dict[str, str], float]]] = {}
+        for name, kind, labels, value in self._collect():
+            collected.setdefault((name, kind), []).append((labels, value))
+        for (name, kind), samples in sorted(collected.items()):
+            header(name, kind)
+            for labels, value in samples:
+                lines.append(
+                    "%s%s %s" % (name, _format_labels(_labels(labels)), repr(value))
+                )
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+REGISTRY = Registry()
+
+
+def phase(provider: str, name: str):
+    """with phase("aladin", "search_page"): ... records into metadata_phase_seconds"""
+    return REGISTRY.timer("metadata_phase_seconds", provider=provider, phase=name)
+
+
+def snapshot() -> Dict:
+    return REGISTRY.snapshot()
+
+
+def prometheus_text() -> str:
+    return REGISTRY.prometheus_text()
+
+
+_logged_at: Optional[float] = None
+_log_lock = threading.Lock()
+
+
+def log_metrics() -> bool:
+    """
+    Write the metrics to the debug log in Prometheus text format, unless that
+    was done less than LOG_INTERVAL seconds ago. The providers call it after
+    every search; True if they were written.
+    """
+    global _logged_at
+    if not LOG_INTERVAL or not log.isEnabledFor(logging.DEBUG):
+        return False
+    now = time.monotonic()
+    with _log_lock:
+        if _logged_at is not None and now - _logged_at < LOG_INTERVAL:
+            return False
+        _logged_at = now
+    log.debug("Metadata provider metrics:\n%s", prometheus_text())
+    return True
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+#  This file is part of the Calibre-Web (https://github.com/janeczku/calibre-web)
+#    Copyright (C) 2024 leechis7
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <http://www.gnu.org/licenses/>.
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from . import metrics
+
+# (requests per second, burst) per bucket
+DEFAULT_RATES = {
+    "html": (4.0, 8),  # www.aladin.co.kr pages; one search is a burst of ~6
+    "api": (5.0, 4),  # ttb/api/*.aspx
+    "image": (8.0, 8),  # image.aladin.co.kr covers
+}
+# Status codes by which the site tells us to slow down
+THROTTLE_STATUS = frozenset([429, 503])
+# Longest pause taken on a throttled response, whatever Retry-After says
+MAX_BACKOFF = 120.0
+
+
+class RateLimited(requests.exceptions.RequestException):
+    pass
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delay-seconds or HTTP-date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class TokenBucket:
+    """
+    Token bucket whose rate adapts to the site: halved on every throttled
+    response (and paused for Retry-After), then raised again step by step
+    with each successful one, up to the configured rate.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.name = name
+        self._clock = clock
+        self._sleep = sleep
+        self.max_rate = rate
+        self.min_rate = rate / 16
+        self.rate = rate
+        self.burst = burst
+        self.throttled = 0
+        self._tokens = float(burst)
+        self._updated = self._clock()
+        self._paused_until = 0.0
+        self._backoff = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Take a token, waiting at most timeout seconds for one"""
+        give_up = None if timeout is None else self._clock() + timeout
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            if give_up is not None and now + wait > give_up:
+                return False
+            self._sleep(wait)
+
+    def throttle(self, retry_after: Optional[float] = None) -> float:
+        """Record a throttled response, returns the pause in seconds"""
+        with self._lock:
+            self.throttled += 1
+            self._backoff += 1
+            self.rate = max(self.rate / 2, self.min_rate)
+            if retry_after is None:
+                retry_after = 2 ** min(self._backoff, 6)
+            pause = min(retry_after, MAX_BACKOFF)
+            now = self._clock()
+            self._paused_until = max(self._paused_until, now + pause)
+            self._tokens = 0.0
+            self._updated = now
+            return pause
+
+    def succeed(self) -> None:
+        with self._lock:
+            self._backoff = 0
+            if self.rate < self.max_rate:
+                self.rate = min(self.rate + self.max_rate / 20, self.max_rate)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "rate": round(self.rate, 2),
+                "throttled": self.throttled,
+                "paused": round(max(self._paused_until - self._clock(), 0.0), 2),
+            }
+
+
+class RateLimiter:
+    """Buckets for HTML pages, the TTB API and images of aladin.co.kr"""
+
+    def __init__(self, rates: Optional[Dict[str, Tuple[float, int]]] = None):
+        self.buckets = {
+            name: TokenBucket(name, rate, burst)
+            for name, (rate, burst) in dict(DEFAULT_RATES, **(rates or {})).items()
+        }
+
+    @staticmethod
+    def bucket_name(url: str) -> str:
+        parts = urlsplit(url)
+        if (parts.hostname or "").startswith("image."):
+            return "image"
+        if "/ttb/api/" in parts.path.lower():
+            return "api"
+        return "html"
+
+    def bucket(self, url: str) -> TokenBucket:
+        return self.buckets[self.bucket_name(url)]
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {name: bucket.stats() for name, bucket in self.buckets.items()}
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process wide limiter, shared by the transports of all providers"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
+
+
+def _collect_metrics():
+    with _limiter_lock:
+        limiter = _limiter
+    if limiter is None:
+        return
+    for name, stats in limiter.stats().items():
+        labels = {"bucket": name}
+        yield "metadata_rate_limit_throttled_total", "counter", labels, stats[
+            "throttled"
+        ]
+        yield "metadata_rate_limit_rate", "gauge", labels, stats["rate"]
+        yield "metadata_rate_limit_paused_seconds", "gauge", labels, stats["paused"]
+
+
+metrics.REGISTRY.add_collector(_collect_metrics)
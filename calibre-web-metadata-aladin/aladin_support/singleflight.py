@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+#  This file is part of the Calibre-Web (https://github.com/janeczku/calibre-web)
+#    Copyright (C) 2024 leechis7
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <http://www.gnu.org/licenses/>.
+import concurrent.futures
+import threading
+import weakref
+from typing import Any, Callable, Dict, Optional
+
+from . import metrics
+
+
+class SingleFlight:
+    """
+    Registry of calls in flight. While a call for a key runs, callers with the
+    same key wait for it and get its result (or exception) instead of running
+    their own. ``coalesced`` counts the calls which were saved that way.
+    """
+
+    def __init__(self, name: str = "generic"):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._flights: Dict[str, concurrent.futures.Future] = {}
+        _registry[name] = self
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[..., Any],
+        *args,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Run fn(*args, **kwargs) unless a call for key is already running.
+        Waiting callers give up after timeout seconds with a TimeoutError;
+        the running call is not affected.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = concurrent.futures.Future()
+                self.calls += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        if not leader:
+            return flight.result(timeout=timeout)
+        try:
+            flight.set_result(fn(*args, **kwargs))
+        except BaseException as ex:
+            flight.set_exception(ex)
+        finally:
+            with self._lock:
+                del self._flights[key]
+        return flight.result()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._flights),
+            }
+
+
+# name -> latest SingleFlight of that name, for the metrics export
+_registry: "weakref.WeakValueDictionary[str, SingleFlight]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _collect_metrics():
+    for name, flight in list(_registry.items()):
+        stats = flight.stats()
+        labels = {"provider": name}
+        yield "metadata_singleflight_calls_total", "counter", labels, stats["calls"]
+        yield "metadata_singleflight_coalesced_total", "counter", labels, stats[
+            "coalesced"
+        ]
+
+
+metrics.REGISTRY.add_collector(_collect_metrics)
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+
+#  This file is part of the Calibre-Web (https://github.com/janeczku/calibre-web)
+#    Copyright (C) 2024 leechis7
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <http://www.gnu.org/licenses/>.
+import threading
+import time
+import weakref
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cps import logger
+from . import metrics
+from .http_cache import page_kind
+from .circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+from .rate_limit import (
+    THROTTLE_STATUS,
+    RateLimited,
+    RateLimiter,
+    get_rate_limiter,
+    parse_retry_after,
+)
+
+log = logger.create()
+
+DEFAULT_POOL_SIZE = 10
+# seconds for connect and for each read when the caller has no deadline
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_HOST_LIMITS = {
+    "www.aladin.co.kr": DEFAULT_POOL_SIZE,
+    "image.aladin.co.kr": 4,
+}
+# Requests in flight per site, shared by every transport of the process, so
+# bulk refreshes of several providers together stay polite to the site.
+POLITENESS_LIMITS = {
+    "aladin.co.kr": 12,
+}
+
+_politeness_slots: Dict[str, threading.BoundedSemaphore] = {}
+_politeness_lock = threading.Lock()
+
+
+def without_query(url: str) -> str:
+    """url for messages: the query may hold an API key"""
+    return urlsplit(url)._replace(query="", fragment="").geturl()
+
+
+def politeness_slot(host: Optional[str]) -> Optional[threading.BoundedSemaphore]:
+    for domain, limit in POLITENESS_LIMITS.items():
+        if host and (host == domain or host.endswith("." + domain)):
+            with _politeness_lock:
+                if domain not in _politeness_slots:
+                    _politeness_slots[domain] = threading.BoundedSemaphore(limit)
+                return _politeness_slots[domain]
+    return None
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    pass
+
+
+class Deadline:
+    """
+    Time budget of one search, shared by all of its sub-requests.
+    ``fired`` counts, per name, the searches which ran out of time.
+    """
+
+    fired: Dict[str, int] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, seconds: float, name: str = "generic"):
+        self.name = name
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+        self._fired = False
+
+    def remaining(self) -> float:
+        return max(self.expires - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def timeout(self, default: float = DEFAULT_TIMEOUT) -> float:
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(
+                "%s: search deadline of %ss exceeded" % (self.name, self.seconds)
+            )
+        return min(default, remaining)
+
+    def fire(self) -> None:
+        with self._lock:
+            if not self._fired:
+                self._fired = True
+                Deadline.fired[self.name] = Deadline.fired.get(self.name, 0) + 1
+
+
+class PooledTransport:
+    """
+    Keep-alive HTTP transport shared by all threads of a metadata provider.
+
+    The underlying requests.Session is never closed between requests, so the
+    connection pool (and its TLS sessions) is reused across searches.
+    Concurrent requests per host are capped by ``host_limits``, and per site
+    (across all transports) by ``POLITENESS_LIMITS``.
+
+    Every request takes a token from the shared rate limiter first. A 429 or
+    503 answer slows its bucket down (honoring Retry-After) and the request
+    is sent again up to ``throttle_retries`` times, if the pause fits in
+    the caller's time budget.
+
+    Each host has a circuit breaker: while a host keeps failing, requests to
+    it raise CircuitOpen at once instead of waiting for connection errors.
+    """
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        name: str = "http",
+        pool_size: int = DEFAULT_POOL_SIZE,
+        host_limits: Optional[Dict[str, int]] = None,
+        max_retries: int = 0,
+        timeout: float = DEFAULT_TIMEOUT,
+        limiter: Optional[RateLimiter] = None,
+        throttle_retries: int = 1,
+    ):
+        self.name = name
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.limiter = limiter or get_rate_limiter()
+        self.throttle_retries = throttle_retries
+        self.host_limits = dict(DEFAULT_HOST_LIMITS, **(host_limits or {}))
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        # one pool per (scheme, host); keep room for http and https of every host
+        self._adapter = HTTPAdapter(
+            pool_connections=max(2 * len(self.host_limits), 4),
+            pool_maxsize=pool_size,
+            max_retries=max_retries,
+        )
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self._host_slots = {
+            host: threading.BoundedSemaphore(limit)
+            for host, limit in self.host_limits.items()
+        }
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+        _transports[name] = self
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).hostname or ""
+        with self._breakers_lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker("%s:%s" % (self.name, host))
+            return self.breakers[host]
+
+    def available(self) -> bool:
+        """False while the circuit of any host is open"""
+        with self._breakers_lock:
+            breakers = list(self.breakers.values())
+        return all(breaker.state != OPEN for breaker in breakers)
+
+    def get(
+        self, url: str, deadline: Optional[Deadline] = None, **kwargs
+    ) -> requests.Response:
+        bucket = self.limiter.bucket(url)
+        breaker = self.breaker(url)
+        for _ in range(self.throttle_retries + 1):
+            if not breaker.allow():
+                raise CircuitOpen(
+                    "%s: %s is failing" % (without_query(url), breaker.name)
+                )
+            ok = None
+            started = time.monotonic()
+            try:
+                wait = kwargs.get("timeout", self.timeout)
+                if deadline is not None:
+                    wait = deadline.timeout(wait)
+                if not bucket.acquire(timeout=wait):
+                    raise RateLimited(
+                        "%s: %s requests are paused" % (without_query(url), bucket.name)
+                    )
+                started = time.monotonic()
+                response = self._send(url, deadline, dict(kwargs))
+                ok = response.status_code < 500
+                self._observe(
+                    url,
+                    response.status_code,
+                    time.monotonic() - started,
+                    len(response.content),
+                )
+            except DeadlineExceeded:
+                # our own time budget ran out, not a failure of the host
+                raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                ok = False
+                self._observe(url, "error", time.monotonic() - started, 0)
+                raise
+            finally:
+                breaker.record(ok, time.monotonic() - started)
+            if response.status_code not in THROTTLE_STATUS:
+                bucket.succeed()
+                return response
+            pause = bucket.throttle(
+                parse_retry_after(response.headers.get("Retry-After"))
+            )
+            log.warning(
+                "%s answered %s, pausing %s requests for %.1fs",
+                urlsplit(url).hostname,
+                response.status_code,
+                bucket.name,
+                pause,
+            )
+        return response
+
+    def _observe(self, url: str, status, seconds: float, size: int) -> None:
+        kind = page_kind(url)
+        metrics.REGISTRY.observe(
+            "metadata_http_request_seconds", seconds, provider=self.name, kind=kind
+        )
+        metrics.REGISTRY.inc(
+            "metadata_http_requests_total", provider=self.name, kind=kind, status=status
+        )
+        if size:
+            metrics.REGISTRY.inc(
+                "metadata_http_response_bytes_total",
+                size,
+                provider=self.name,
+                kind=kind,
+            )
+
+    def _send(
+        self, url: str, deadline: Optional[Deadline], kwargs: dict
+    ) -> requests.Response:
+        if deadline is not None:
+            kwargs["timeout"] = deadline.timeout(kwargs.get("timeout", self.timeout))
+        else:
+            kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).hostname
+        # always host slot first, then the site wide one
+        slots = [self._host_slots.get(host), politeness_slot(host)]
+        acquired = []
+        try:
+            for slot in slots:
+                if slot is None:
+                    continue
+                if not slot.acquire(timeout=kwargs["timeout"]):
+                    raise DeadlineExceeded(
+                        "%s: no free connection slot" % without_query(url)
+                    )
+                acquired.append(slot)
+            if deadline is not None and acquired:
+                kwargs["timeout"] = deadline.timeout(kwargs["timeout"])
+            return self.session.get(url, **kwargs)
+        finally:
+            for slot in reversed(acquired):
+                slot.release()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Requests and newly opened connections per host, as seen by urllib3."""
+        stats = {}
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = stats.setdefault(
+                pool.host, {"requests": 0, "connections": 0, "reused": 0}
+            )
+            host["requests"] += pool.num_requests
+            host["connections"] += pool.num_connections
+            host["reused"] += max(pool.num_requests - pool.num_connections, 0)
+        return stats
+
+    def close(self) -> None:
+        self.session.close()
+
+
+# name -> latest transport of that name (configure() replaces them)
+_transports: "weakref.WeakValueDictionary[str, PooledTransport]" = (
+    weakref.WeakValueDictionary()
+)
+CIRCUIT_STATES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def _collect_metrics():
+    with Deadline._lock:
+        fired = dict(Deadline.fired)
+    for name, count in fired.items():
+        yield "metadata_deadline_fired_total", "counter", {"provider": name}, count
+    for name, transport in list(_transports.items()):
+        with transport._breakers_lock:
+            breakers = list(transport.breakers.items())
+        for host, breaker in breakers:
+            stats = breaker.stats()
+            labels = {"provider": name, "host": host}
+            yield "metadata_circuit_state", "gauge", labels, CIRCUIT_STATES[
+                stats["state"]
+            ]
+            yield "metadata_circuit_opens_total", "counter", labels, stats["opened"]
+
+
+metrics.REGISTRY.add_collector(_collect_metrics)
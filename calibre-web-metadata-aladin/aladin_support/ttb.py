@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+
+#  This file is part of the Calibre-Web (https://github.com/janeczku/calibre-web)
+#    Copyright (C) 2024 leechis7
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program. If not, see <http://www.gnu.org/licenses/>.
+# Aladin TTB ItemLookUp: all details of one item (metadata, full description,
+# table of contents) in a single JSON request, instead of scraping
+# wproduct.aspx and two getContents.aspx fragments.
+import hashlib
+import json
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from . import metrics
+from .http_cache import ResponseCache, canonical_url, get_cache
+from .singleflight import SingleFlight
+from .transport import Deadline, PooledTransport
+
+TTB_KEY = "ttbleechis71322001"
+ITEM_LOOKUP_URL = "https://www.aladin.co.kr/ttb/api/ItemLookUp.aspx"
+# table of contents, story, description, publisher's description
+OPT_RESULT = ("Toc", "Story", "fulldescription", "fulldescription2")
+# contributions listed as authors, as on the product page (ld+json)
+AUTHOR_ROLES = frozenset(["지은이", "글", "원작"])
+ROLE = re.compile(r"\s*\(([^()]*)\)\s*$")
+COVER_SIZE = re.compile(r"/(coversum|cover200)/")
+TTB_KEY_PARAM = re.compile(r"(ttbkey=)[^&\s'\"]+", re.IGNORECASE)
+
+# calls per key and day; the count restarts at midnight in Seoul
+DAILY_QUOTA = 5000
+QUOTA_TZ = timezone(timedelta(hours=9))
+# bulk lookups stop this many calls before the quota, which stay for searches
+BULK_RESERVE = 500
+# the count is written to the cache every this many calls
+QUOTA_FLUSH_EVERY = 20
+
+
+class TTBError(Exception):
+    pass
+
+
+class QuotaExceeded(TTBError):
+    pass
+
+
+class DailyQuota:
+    """
+    Counts the TTB calls made with one key today. The count is kept in the
+    mappings of ``cache`` so a restart doesn't forget the calls already made.
+    """
+
+    def __init__(
+        self,
+        limit: int = DAILY_QUOTA,
+        cache: Optional[ResponseCache] = None,
+        ttb_key: str = TTB_KEY,
+    ):
+        self.limit = limit
+        self.cache = cache
+        self.ttb_key = ttb_key
+        self._day = None
+        self._used = 0
+        self._unsaved = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def today() -> str:
+        return datetime.now(QUOTA_TZ).date().isoformat()
+
+    def _roll(self) -> None:
+        day = self.today()
+        if day == self._day:
+            return
+        self._day, self._used, self._unsaved = day, 0, 0
+        if self.cache is not None:
+            saved = self.cache.get_mapping("ttb-quota", self._key(day))
+            self._used = int(saved) if saved else 0
+
+    def _key(self, day: str) -> str:
+        return "%s:%s" % (self.ttb_key, day)
+
+    def _save(self) -> None:
+        if self.cache is not None and self._unsaved:
+            self.cache.set_mapping("ttb-quota", self._key(self._day), str(self._used))
+            self._unsaved = 0
+
+    def take(self, reserve: int = 0) -> bool:
+        """Count one call; False (nothing counted) if fewer than ``reserve`` would be left"""
+        with self._lock:
+            self._roll()
+            if self._used >= self.limit - reserve:
+                return False
+            self._used += 1
+            self._unsaved += 1
+            if self._unsaved >= QUOTA_FLUSH_EVERY or self._used >= self.limit:
+                self._save()
+            return True
+
+    def remaining(self, reserve: int = 0) -> int:
+        with self._lock:
+            self._roll()
+            return max(0, self.limit - reserve - self._used)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._save()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._roll()
+            return {"day": self._day, "used": self._used, "limit": self.limit}
+
+
+_quotas: Dict[str, DailyQuota] = {}
+_quotas_lock = threading.Lock()
+
+
+def key_id(ttb_key: str) -> str:
+    """Short hash naming a TTB key in metrics and logs, which must not show the key"""
+    return hashlib.sha256(ttb_key.encode("utf-8")).hexdigest()[:8]
+
+
+def redact(message) -> str:
+    """
+    str(message) with the ttbkey of any TTB url in it hidden; for logging
+    errors of requests, which quote the url they failed on
+    """
+    return TTB_KEY_PARAM.sub(r"\1***", str(message))
+
+
+def get_quota(ttb_key: str = TTB_KEY) -> DailyQuota:
+    """Process wide quota of a TTB key, shared by every provider using the key"""
+    with _quotas_lock:
+        if ttb_key not in _quotas:
+            _quotas[ttb_key] = DailyQuota(cache=get_cache("aladin"), ttb_key=ttb_key)
+        return _quotas[ttb_key]
+
+
+def _collect_metrics():
+    with _quotas_lock:
+        quotas = list(_quotas.items())
+    for ttb_key, quota in quotas:
+        stats = quota.stats()
+        labels = {"key": key_id(ttb_key)}
+        yield "metadata_ttb_quota_used", "gauge", labels, stats["used"]
+        yield "metadata_ttb_quota_limit", "gauge", labels, stats["limit"]
+
+
+metrics.REGISTRY.add_collector(_collect_metrics)
+
+
+def lookup_url(
+    item_id: Optional[str] = None,
+    isbn: Optional[str] = None,
+    ttb_key: str = TTB_KEY,
+    opt_result=OPT_RESULT,
+) -> str:
+    if item_id:
+        id_type, value = "ItemId", item_id
+    elif isbn and len(isbn) == 13:
+        id_type, value = "ISBN13", isbn
+    else:
+        id_type, value = "ISBN", isbn
+    query = [
+        ("ttbkey", ttb_key),
+        ("itemIdType", id_type),
+        ("ItemId", value),
+        ("output", "js"),
+        ("Version", "20131101"),
+        ("Cover", "Big"),
+        ("OptResult", ",".join(opt_result)),
+    ]
+    return ITEM_LOOKUP_URL + "?" + urlencode(query)
+
+
+def parse_item(text: str) -> Optional[Dict]:
+    """The looked up item, None if Aladin doesn't know it; TTBError on API errors"""
+    try:
+        data = json.loads(text.strip().rstrip(";"))
+    except ValueError as ex:
+        raise TTBError("ItemLookUp: invalid response, %s" % ex)
+    if not isinstance(data, dict):
+        raise TTBError("ItemLookUp: unexpected response")
+    if "errorCode" in data:
+        raise TTBError(
+            "ItemLookUp error %s: %s" % (data["errorCode"], data.get("errorMessage"))
+        )
+    items = data.get("item") or []
+    return items[0] if items else None
+
+
+# lookups of the same item by any provider share one request
+_lookups = SingleFlight("ttb")
+
+
+def lookup_item(
+    url: str,
+    transport: PooledTransport,
+    cache: ResponseCache,
+    quota: DailyQuota,
+    deadline: Optional[Deadline] = None,
+    reserve: int = 0,
+) -> Optional[Dict]:
+    """
+    The item of an ItemLookUp url (see parse_item), from the cache when it
+    has the answer. Otherwise a call is taken from quota, QuotaExceeded
+    raised when no more than ``reserve`` are left, and the answer stored in
+    cache.
+    """
+    return _lookups.do(
+        canonical_url(url),
+        _fetch_item,
+        url,
+        transport,
+        cache,
+        quota,
+        deadline,
+        reserve,
+        timeout=deadline.remaining() if deadline else None,
+    )
+
+
+def _fetch_item(
+    url: str,
+    transport: PooledTransport,
+    cache: ResponseCache,
+    quota: DailyQuota,
+    deadline: Optional[Deadline],
+    reserve: int = 0,
+) -> Optional[Dict]:
+    text = cache.get(url)
+    if text is not None:
+        return parse_item(text)
+    if not quota.take(reserve):
+        raise QuotaExceeded("daily TTB quota used up")
+    r = transport.get(url, deadline=deadline)
+    r.raise_for_status()
+    # error answers raise TTBError here and are not cached
+    item = parse_item(r.text)
+    cache.set(url, r.text)
+    return item
+
+
+def item_authors(item: Dict) -> List[str]:
+    """
+    Authors of an item. ItemLookUp lists every contributor with a role after
+    each group of names, e.g. "A, B (지은이), C (옮긴이)"; translators,
+    illustrators and the like are left out. When nobody has an author role
+    the first group is taken (e.g. "A (엮은이)").
+    """
+    groups: List[Tuple[str, List[str]]] = []
+    names: List[str] = []
+    for part in item.get("author", "").split(","):
+        match = ROLE.search(part)
+        name = part[: match.start()] if match else part
+        if name.strip():
+            names.append(name.strip())
+        if match:
+            groups.append((match.group(1).strip(), names))
+            names = []
+    if names:
+        groups.append(("", names))
+    authors = [name for role, group in groups if role in AUTHOR_ROLES for name in group]
+    if not authors and groups:
+        authors = groups[0][1]
+    return authors
+
+
+def cover_url(item: Dict) -> str:
+    """Largest cover: the API answers with coversum or, with Cover=Big, cover200"""
+    return COVER_SIZE.sub("/cover500/", item.get("cover", ""))
+
+
+def _field(item: Dict, name: str) -> str:
+    # OptResult fields come in item or in item.subInfo, in varying case
+    name = name.lower()
+    for source in (item.get("subInfo") or {}, item):
+        for key, value in source.items():
+            if key.lower() == name and isinstance(value, str) and value.strip():
+                return value
+    return ""
+
+
+def item_description(item: Dict) -> str:
+    """Description + <br/> + table of contents, like the one scraped from getContents.aspx"""
+    introduce = (
+        _field(item, "fullDescription2")
+        or _field(item, "fullDescription")
+        or _field(item, "story")
+        or item.get("description", "")
+    )
+    toc = _field(item, "toc")
+    if not toc:
+        return introduce
+    return introduce + "<br/>" + toc
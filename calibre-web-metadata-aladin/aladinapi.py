@@ -17,31 +17,106 @@
 #  along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 # Aladin Books api document
-from typing import Dict, List, Optional
+import concurrent.futures
+import contextlib
+import threading
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from urllib.parse import quote
 from datetime import datetime
 
 import requests
 
 from cps import logger
-from cps.isoLanguages import get_lang3, get_language_name
 from cps.services.Metadata import MetaRecord, MetaSourceInfo, Metadata
 
+if __package__:
+    # calibre-web: cps/metadata_provider/aladin_support
+    from .aladin_support import (
+        BULK_RESERVE,
+        TTB_KEY,
+        BatchSearch,
+        CircuitOpen,
+        Deadline,
+        PooledTransport,
+        QuotaExceeded,
+        SingleFlight,
+        canonical_url,
+        cover_url,
+        get_cache,
+        get_quota,
+        is_korean,
+        item_authors,
+        item_description,
+        log_metrics,
+        lookup_item,
+        lookup_url,
+        miss_key,
+        normalize_isbn,
+        phase,
+        redact,
+        to_isbn13,
+    )
+else:
+    # 저장소에서 바로 실행할 때 (python aladinapi.py, benchmarks)
+    from aladin_support import (
+        BULK_RESERVE,
+        TTB_KEY,
+        BatchSearch,
+        CircuitOpen,
+        Deadline,
+        PooledTransport,
+        QuotaExceeded,
+        SingleFlight,
+        canonical_url,
+        cover_url,
+        get_cache,
+        get_quota,
+        is_korean,
+        item_authors,
+        item_description,
+        log_metrics,
+        lookup_item,
+        lookup_url,
+        miss_key,
+        normalize_isbn,
+        phase,
+        redact,
+        to_isbn13,
+    )
+
 log = logger.create()
 
-TTB_KEY = "ttbleechis71322001"
 
+def _new_transport(pool_size: int, max_retries: int, timeout: float) -> PooledTransport:
+    return PooledTransport(
+        name="aladinapi",
+        pool_size=pool_size,
+        host_limits={"www.aladin.co.kr": pool_size},
+        max_retries=max_retries,
+        timeout=timeout,
+    )
 
-class AladinAPI(Metadata):
+
+class AladinAPI(BatchSearch, Metadata):
     __name__ = "Aladin API"
     __id__ = "aladinapi"
     DESCRIPTION = "Aladin Books"
+    # 국내도서와 외국도서 검색을 합쳐 쓸 수 있는 시간(초)
+    SEARCH_TIMEOUT = 10
+    REQUEST_TIMEOUT = 5
+    MAX_RESULTS = 5
+    # 연결 풀 크기와 연결 실패 시 재시도 횟수
+    POOL_SIZE = 4
+    MAX_RETRIES = 2
+    # search_many: 검색 하나가 요청 2개(국내, 외국)를 보낸다.
+    BATCH_WORKERS = POOL_SIZE // 2
     META_URL = "https://www.aladin.co.kr/"
     BOOK_URL = "https://www.aladin.co.kr/shop/wproduct.aspx?ItemId="
     SEARCH_URL = (
         "https://www.aladin.co.kr/ttb/api/ItemSearch.aspx"
         f"?ttbkey={TTB_KEY}"
-        "&MaxResults=5"
+        f"&MaxResults={MAX_RESULTS}"
         "&start=1"
         "&QueryType=Title"
         "&SearchTarget=Book"
@@ -52,7 +127,7 @@ class AladinAPI(Metadata):
     SEARCH_F_URL = (
         "https://www.aladin.co.kr/ttb/api/ItemSearch.aspx"
         f"?ttbkey={TTB_KEY}"
-        "&MaxResults=5"
+        f"&MaxResults={MAX_RESULTS}"
         "&start=1"
         "&QueryType=Title"
         "&SearchTarget=Foreign"
@@ -60,51 +135,164 @@ class AladinAPI(Metadata):
         "&Version=20131101"
         "&Query="
     )
+    # 모든 검색과 calibre-web 요청 스레드가 keep-alive 연결 풀을 같이 쓴다.
+    transport = _new_transport(POOL_SIZE, MAX_RETRIES, REQUEST_TIMEOUT)
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=POOL_SIZE, thread_name_prefix="aladinapi"
+    )
+    # executor를 쓰고 있는 호출 수. configure()가 바꾼 풀은 다 쓴 뒤에 닫는다.
+    _executor_users: Dict[concurrent.futures.ThreadPoolExecutor, int] = {}
+    _executor_lock = threading.Lock()
+    # 같은 검색어로 동시에 들어온 검색은 API 응답 하나를 나눠 받는다.
+    inflight = SingleFlight(__id__)
+    # 결과가 없었던 검색어 (Aladin과 같은 데이터베이스)
+    cache = get_cache("aladin")
+    # TTB 키의 하루 호출 한도 (Aladin과 같이 센다)
+    quota = get_quota(TTB_KEY)
+
+    @classmethod
+    def configure(
+        cls,
+        pool_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """Replace the shared transport, e.g. with a bigger pool for bulk refreshes"""
+        cls.POOL_SIZE = pool_size or cls.POOL_SIZE
+        cls.MAX_RETRIES = cls.MAX_RETRIES if max_retries is None else max_retries
+        cls.REQUEST_TIMEOUT = timeout or cls.REQUEST_TIMEOUT
+        # 진행 중인 검색은 이전 풀로 마저 끝난다.
+        with cls._executor_lock:
+            old_executor = cls.executor
+            cls.transport = _new_transport(
+                cls.POOL_SIZE, cls.MAX_RETRIES, cls.REQUEST_TIMEOUT
+            )
+            cls.executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=cls.POOL_SIZE, thread_name_prefix="aladinapi"
+            )
+            in_use = old_executor in cls._executor_users
+        if not in_use:
+            old_executor.shutdown(wait=False)
+
+    @classmethod
+    @contextlib.contextmanager
+    def _borrow_executor(cls) -> Iterator[concurrent.futures.ThreadPoolExecutor]:
+        """The current executor, kept open until the caller is done with it"""
+        with cls._executor_lock:
+            executor = cls.executor
+            cls._executor_users[executor] = cls._executor_users.get(executor, 0) + 1
+        try:
+            yield executor
+        finally:
+            with cls._executor_lock:
+                cls._executor_users[executor] -= 1
+                retired = not cls._executor_users[executor]
+                if retired:
+                    del cls._executor_users[executor]
+                retired = retired and executor is not cls.executor
+            if retired:
+                executor.shutdown(wait=False)
 
     def search(
         self, query: str, generic_cover: str = "", locale: str = "ko"
     ) -> Optional[List[MetaRecord]]:
-        val = list()
-        if self.active:
+        with phase(self.__id__, "search"):
+            val = list(self.search_iter(query, generic_cover, locale))
+        log_metrics()
+        return [x[1] for x in sorted(val, key=itemgetter(0))]
 
-            title_tokens = list(self.get_title_tokens(query, strip_joiners=False))
-            if title_tokens:
-                tokens = [quote(t.encode("utf-8")) for t in title_tokens]
-                query = "+".join(tokens)
+    def search_iter(
+        self, query: str, generic_cover: str = "", locale: str = "ko"
+    ) -> Iterator[Tuple[int, MetaRecord]]:
+        # circuit이 열려 있으면 연결 오류를 기다리지 않고 바로 끝낸다.
+        if not self.active or not self.available():
+            return
+        deadline = Deadline(AladinAPI.SEARCH_TIMEOUT, self.__id__)
+        key = miss_key(query)
+        if self.cache.is_miss(self.__id__, key):
+            return
 
-            # 국내도서
-            try:
-                results = requests.get(AladinAPI.SEARCH_URL + query)
-                results.raise_for_status()
-            except Exception as e:
-                log.warning(e)
-                return []
-            for result in results.json().get("item", []):
-                val.append(
-                    self._parse_search_result(
-                        result=result,
-                        generic_cover=generic_cover,
-                        locale="ko",
-                        lang="kor",
-                    )
-                )
-            # 외국도서
-            try:
-                results = requests.get(AladinAPI.SEARCH_F_URL + query)
-                results.raise_for_status()
-            except Exception as e:
-                log.warning(e)
-                return []
-            for result in results.json().get("item", []):
-                val.append(
-                    self._parse_search_result(
-                        result=result,
-                        generic_cover=generic_cover,
-                        locale="ko",
-                        lang="eng",
-                    )
-                )
-        return val
+        title_tokens = list(self.get_title_tokens(query, strip_joiners=False))
+        if title_tokens:
+            tokens = [quote(t.encode("utf-8")) for t in title_tokens]
+            query = "+".join(tokens)
+
+        # 국내도서와 외국도서를 동시에 검색하고, 먼저 온 쪽부터 돌려준다.
+        targets = [(AladinAPI.SEARCH_URL, "kor"), (AladinAPI.SEARCH_F_URL, "eng")]
+        with self._borrow_executor() as executor:
+            fut = {
+                executor.submit(self._search_target, url + query, deadline): index
+                for index, (url, lang) in enumerate(targets)
+            }
+        found = answered = 0
+        try:
+            for future in concurrent.futures.as_completed(
+                fut, timeout=deadline.remaining()
+            ):
+                index = fut[future]
+                items = future.result()
+                if items is None:
+                    continue
+                answered += 1
+                found += len(items)
+                for rank, result in enumerate(items):
+                    with phase(self.__id__, "parse_api"):
+                        match = self._parse_search_result(
+                            result=result,
+                            generic_cover=generic_cover,
+                            locale="ko",
+                            lang=targets[index][1],
+                        )
+                    yield index * AladinAPI.MAX_RESULTS + rank, match
+        except concurrent.futures.TimeoutError:
+            deadline.fire()
+            log.warning("Aladin API search for %r exceeded its deadline", query)
+        finally:
+            for future in fut:
+                future.cancel()
+        # 두 검색이 모두 응답했는데 결과가 없을 때만 기억한다.
+        if answered == len(targets) and not found:
+            self.cache.add_miss(self.__id__, key)
+        log.debug(
+            "Aladin API connections: %s, coalesced: %s",
+            self.transport.stats(),
+            self.inflight.stats(),
+        )
+
+    def available(self) -> bool:
+        return self.transport.available()
+
+    def _search_target(self, url: str, deadline: Deadline) -> Optional[List[Dict]]:
+        try:
+            return self.inflight.do(
+                canonical_url(url),
+                self._fetch_items,
+                url,
+                deadline,
+                timeout=deadline.remaining(),
+            )
+        except Exception as e:
+            log.warning(redact(e))
+        return None
+
+    def _fetch_items(self, url: str, deadline: Deadline) -> Optional[List[Dict]]:
+        # 요청이 실패하면 None, 결과가 없으면 빈 목록
+        if not self.quota.take():
+            log.warning("Aladin API: daily TTB quota used up")
+            return None
+        try:
+            with phase(self.__id__, "api_search"):
+                results = self.transport.get(url, deadline=deadline)
+            results.raise_for_status()
+            with phase(self.__id__, "decode_api"):
+                return results.json().get("item", [])
+        except requests.exceptions.Timeout as e:
+            if deadline.expired:
+                deadline.fire()
+            log.warning(redact(e))
+        except Exception as e:
+            log.warning(redact(e))
+        return None
 
     def _parse_search_result(
         self, result: Dict, generic_cover: str, locale: str, lang: str = "kor"
@@ -144,6 +332,145 @@ class AladinAPI(Metadata):
         match.identifiers["isbn"] = result["isbn13"]
         return match
 
+    def lookup_isbns(
+        self,
+        isbns: Iterable[str],
+        generic_cover: str = "",
+        workers: Optional[int] = None,
+        reserve: int = BULK_RESERVE,
+    ) -> Iterator[Tuple[str, Optional[MetaRecord]]]:
+        """
+        Resolve many ISBNs with ItemLookUp, yielding (isbn, record) pairs as the
+        answers arrive. isbn is the input as given; record is None for invalid
+        or unknown ISBNs and for failed lookups. Duplicates (also the ISBN-10
+        and ISBN-13 of one book) are looked up once, cached answers are used
+        without a request, and at most ``workers`` lookups run at a time, each
+        within SEARCH_TIMEOUT. Lookups go through ttb.lookup_item, so they are
+        shared with identical lookups of the other providers.
+
+        Raises QuotaExceeded when no more than ``reserve`` TTB calls are left
+        for today, and CircuitOpen when the site stops answering, in both cases
+        after yielding every record already looked up.
+        """
+        pending: Dict[str, List[str]] = {}
+        for raw in isbns:
+            isbn = normalize_isbn(raw)
+            if isbn is None:
+                yield raw, None
+            else:
+                pending.setdefault(to_isbn13(isbn), []).append(raw)
+
+        todo = iter(list(pending))
+        running: Dict[concurrent.futures.Future, str] = {}
+        stop = None
+        window = workers or self.POOL_SIZE
+        with self._borrow_executor() as executor:
+            try:
+                while True:
+                    while stop is None and len(running) < window:
+                        isbn = next(todo, None)
+                        if isbn is None:
+                            break
+                        if not self.available():
+                            stop = CircuitOpen("Aladin API is failing")
+                        else:
+                            future = executor.submit(self._lookup_isbn, isbn, reserve)
+                            running[future] = isbn
+                    if not running:
+                        break
+                    done, _ = concurrent.futures.wait(
+                        running, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        isbn = running.pop(future)
+                        try:
+                            item = future.result()
+                        except (CircuitOpen, QuotaExceeded) as e:
+                            # 이 ISBN은 조회하지 못했으니 pending에 남겨 둔다.
+                            stop = stop or e
+                            continue
+                        record = (
+                            self._parse_item(item, isbn, generic_cover)
+                            if item
+                            else None
+                        )
+                        for raw in pending.pop(isbn):
+                            yield raw, record
+            finally:
+                for future in running:
+                    future.cancel()
+                self.quota.flush()
+        if stop is not None:
+            raise type(stop)("%s, %d ISBNs not looked up" % (stop, len(pending)))
+
+    def _lookup_isbn(self, isbn: str, reserve: int) -> Optional[Dict]:
+        url = lookup_url(isbn=isbn)
+        # 느린 ISBN 하나가 일괄 조회 전체를 붙잡지 않도록 조회마다 시간을 정한다.
+        deadline = Deadline(self.SEARCH_TIMEOUT, self.__id__)
+        try:
+            with phase(self.__id__, "lookup"):
+                return lookup_item(
+                    url, self.transport, self.cache, self.quota, deadline, reserve
+                )
+        except (CircuitOpen, QuotaExceeded):
+            raise
+        except Exception as e:
+            log.warning(redact(e))
+        return None
+
+    def _parse_item(self, item: Dict, isbn: str, generic_cover: str) -> MetaRecord:
+        # Aladin._parse_item과 같은 모양의 결과를 만든다.
+        item_id = str(item["itemId"])
+        match = MetaRecord(
+            id=item_id,
+            title=item.get("title", "").replace(" (Paperback)", ""),
+            authors=item_authors(item),
+            url=AladinAPI.BOOK_URL + item_id,
+            source=MetaSourceInfo(
+                id=self.__id__,
+                description=AladinAPI.DESCRIPTION,
+                link=AladinAPI.META_URL,
+            ),
+            publisher=item.get("publisher"),
+            publishedDate=item.get("pubDate"),
+            tags=[tag.strip() for tag in item.get("categoryName", "").split(",")],
+            cover=cover_url(item) or generic_cover,
+            # ItemLookUp은 전체 소개와 목차를 같이 준다.
+            description=item_description(item),
+            languages=["한국어" if is_korean(isbn) else "영어"],
+        )
+        try:
+            match.rating = int(item.get("customerReviewRank")) / 2
+        except (TypeError, ValueError):
+            match.rating = 0
+        match.series = (item.get("seriesInfo") or {}).get("seriesName", "")
+        match.series_index = 1
+        match.identifiers = {"aladin.co.kr": match.id}
+        match.identifiers["isbn"] = item.get("isbn13") or item.get("isbn") or isbn
+        self.cache.set_mapping("isbn", isbn, match.id)
+        return match
+
+    def get_description(
+        self, identifiers: Dict, fallback: str = "", deadline: Optional[Deadline] = None
+    ) -> str:
+        """Full description and table of contents of a search result"""
+        item_id = identifiers.get("aladin.co.kr")
+        if not item_id:
+            return fallback
+        try:
+            with phase(self.__id__, "lookup"):
+                item = lookup_item(
+                    lookup_url(item_id=str(item_id)),
+                    self.transport,
+                    self.cache,
+                    self.quota,
+                    deadline or Deadline(self.SEARCH_TIMEOUT, self.__id__),
+                )
+        except Exception as e:
+            log.warning(redact(e))
+            return fallback
+        return (item_description(item) if item else "") or fallback
+
     @staticmethod
     def _parse_cover(result: Dict, generic_cover: str) -> str:
         if result["cover"]:
@@ -153,6 +480,9 @@ class AladinAPI(Metadata):
 
     @staticmethod
     def _parse_languages(result: Dict, locale: str) -> List[str]:
+        # cps.isoLanguages는 babel과 pycountry를 불러오므로 쓸 때만 import 한다.
+        from cps.isoLanguages import get_lang3, get_language_name
+
         language_iso2 = locale
         languages = (
             [get_language_name(locale, get_lang3(language_iso2))]
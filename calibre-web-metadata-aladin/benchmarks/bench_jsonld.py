@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Compare reading the ld+json block of wproduct.aspx pages with the raw scan
+(extract_json_ld) against the full BeautifulSoup parse (parse_json_ld).
+
+    python benchmarks/bench_jsonld.py [page.html ...]
+
+Without arguments a synthetic product page is used.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from aladin import extract_json_ld, parse_json_ld  # noqa: E402
+from benchmarks.pages import product_page  # noqa: E402
+
+
+def peak_memory(func, page):
+    tracemalloc.start()
+    func(page)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def bench(name, page, repeat):
+    print("%s (%d KB)" % (name, len(page.encode("utf-8")) // 1024))
+    assert extract_json_ld(page) == parse_json_ld(page), "both paths must agree"
+    for label, func in (("scan", extract_json_ld), ("soup", parse_json_ld)):
+        best = min(timeit.repeat(lambda: func(page), number=1, repeat=repeat))
+        print(
+            "  %-5s %9.3f ms/page  peak %8.1f KB"
+            % (label, best * 1000, peak_memory(func, page) / 1024)
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pages", nargs="*", help="recorded wproduct.aspx pages")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    if not args.pages:
+        bench("synthetic", product_page(1), args.repeat)
+    for path in args.pages:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            bench(os.path.basename(path), f.read(), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
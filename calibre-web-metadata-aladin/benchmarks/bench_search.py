@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Offline latency benchmark of Aladin.search and AladinAPI.search.
+
+    python benchmarks/bench_search.py [--provider aladin] [--latency 0.08] [--runs 10]
+    python benchmarks/bench_search.py --fixtures benchmarks/fixtures
+    python benchmarks/bench_search.py --record benchmarks/fixtures "query" ...
+
+Requests are served by ReplayTransport: from recorded fixtures when
+--fixtures is given (see --record, which needs network), from synthetic
+pages otherwise. Reports p50/p95 search latency, requests per search and
+CPU time per parsing phase.
+"""
+
+import argparse
+import contextlib
+import functools
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from aladin_support.http_cache import ResponseCache  # noqa: E402
+from aladin_support.ttb import DailyQuota  # noqa: E402
+from benchmarks.pages import synthetic_response  # noqa: E402
+from benchmarks.replay import RecordingTransport, ReplayTransport  # noqa: E402
+
+DEFAULT_QUERIES = [
+    "혼자 만들면서 공부하는 파이썬",
+    "GPT API를 활용한 인공지능 앱 개발, 2판",
+    "클린 코드",
+    "interfaceless",
+    "9791169210027",
+]
+# provider method -> phase; all of them run in a single thread
+PHASES = {
+    "aladin": {
+        "_search_links": "search page",
+        "_lookup_record": "item lookup",
+        "_parse_record": "product page",
+        "_parse_publisher_desc": "contents",
+        "_parse_toc": "contents",
+    },
+    "aladinapi": {
+        "_fetch_items": "api response",
+        "_parse_search_result": "api records",
+        "get_description": "item lookup",
+    },
+}
+
+
+def load_provider(name):
+    if name == "aladin":
+        from aladin import Aladin
+
+        return Aladin()
+    from aladinapi import AladinAPI
+
+    return AladinAPI()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(round(pct / 100.0 * (len(values) - 1))), len(values) - 1)]
+
+
+class PhaseTimer:
+    """CPU time (time.thread_time) spent in selected methods of a provider"""
+
+    def __init__(self):
+        self.cpu = defaultdict(float)
+        self.calls = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def wrap(self, provider, method, phase):
+        func = getattr(provider, method)
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.thread_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.cpu[phase] += time.thread_time() - start
+                    self.calls[phase] += 1
+
+        setattr(provider, method, timed)
+
+
+@contextlib.contextmanager
+def isolated(provider):
+    """
+    Give back the cache and the TTB quota of the provider class afterwards.
+    Both are shared by the whole process and saved under CACHE_DIR, which is
+    calibre-web's own cache unless the variable says otherwise.
+    """
+    cls = type(provider)
+    saved = cls.cache, cls.quota
+    try:
+        yield
+    finally:
+        cls.cache, cls.quota = saved
+
+
+def fresh_cache(provider, directory, warm):
+    # 매 실행마다 빈 캐시로 시작한다 (--warm이면 첫 실행의 캐시를 계속 쓴다).
+    # TTB 호출은 실제 키의 오늘 한도가 아니라 임시 캐시에 센다.
+    if warm and getattr(provider, "_bench_cache", None):
+        return
+    cache = ResponseCache(os.path.join(directory, "%d.db" % time.monotonic_ns()))
+    type(provider).cache = cache
+    type(provider).quota = DailyQuota(cache=cache)
+    provider._bench_cache = cache
+
+
+def bench(name, args, queries):
+    provider = load_provider(name)
+    if args.lazy_description:
+        provider.LAZY_DESCRIPTION = True
+    transport = ReplayTransport(
+        args.fixtures, args.latency, args.jitter, synthetic_response
+    )
+    provider.transport = transport
+    timer = PhaseTimer()
+    for method, phase in PHASES[name].items():
+        timer.wrap(provider, method, phase)
+
+    search_times = []
+    searches = results = 0
+    with tempfile.TemporaryDirectory() as directory, isolated(provider):
+        for _ in range(args.runs):
+            fresh_cache(provider, directory, args.warm)
+            for query in queries:
+                start = time.perf_counter()
+                records = provider.search(query)
+                search_times.append(time.perf_counter() - start)
+                searches += 1
+                results += len(records)
+        requests_per_search = transport.requests / max(searches, 1)
+
+    print(
+        "%s: %d searches, %.1f results/search, %.1f requests/search (%d not recorded)"
+        % (
+            name,
+            searches,
+            results / max(searches, 1),
+            requests_per_search,
+            transport.missing,
+        )
+    )
+    if search_times:
+        print(
+            "  search       p50 %8.1f ms  p95 %8.1f ms"
+            % (percentile(search_times, 50) * 1000, percentile(search_times, 95) * 1000)
+        )
+    for phase, cpu in sorted(timer.cpu.items()):
+        print(
+            "  cpu %-16s %8.2f ms/search  %8.2f ms/call"
+            % (
+                phase,
+                cpu * 1000 / max(searches, 1),
+                cpu * 1000 / max(timer.calls[phase], 1),
+            )
+        )
+
+
+def record(name, directory, queries):
+    provider = load_provider(name)
+    provider.transport = RecordingTransport(provider.transport, directory)
+    for query in queries:
+        records = provider.search(query)
+        print("%s: %r -> %d results" % (name, query, len(records)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "queries", nargs="*", help="search queries (default: a fixed set)"
+    )
+    parser.add_argument(
+        "--provider",
+        choices=sorted(PHASES),
+        action="append",
+        help="provider to measure, may be repeated (default: all)",
+    )
+    parser.add_argument("--fixtures", help="directory of recorded responses")
+    parser.add_argument(
+        "--record",
+        metavar="DIR",
+        help="search the live site and record responses to DIR",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.08, help="seconds added to every request"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.04, help="up to this many more seconds"
+    )
+    parser.add_argument(
+        "--runs", type=int, default=5, help="times the query set is searched"
+    )
+    parser.add_argument(
+        "--warm", action="store_true", help="keep the response cache between runs"
+    )
+    parser.add_argument(
+        "--lazy-description",
+        action="store_true",
+        help="leave the getContents.aspx fragments to load_description()",
+    )
+    args = parser.parse_args()
+    queries = args.queries or DEFAULT_QUERIES
+    for name in args.provider or sorted(PHASES):
+        if args.record:
+            record(name, args.record, queries)
+        else:
+            bench(name, args, queries)
+
+
+if __name__ == "__main__":
+    main()
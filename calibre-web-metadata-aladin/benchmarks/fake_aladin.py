@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for the parts of aladin.co.kr the providers use.
+
+    python benchmarks/fake_aladin.py [--port 8765] [--fixtures DIR]
+                                     [--latency 0.1] [--error-rate 0.02] [--throttle 50]
+
+Serves wsearchresult.aspx, wproduct.aspx, getContents.aspx and the TTB
+ItemSearch.aspx and ItemLookUp.aspx API from recorded fixtures (see bench_search.py --record),
+or synthetic pages for anything not recorded. Latency, the share of 500
+errors and a requests-per-second limit above which it answers 429 with
+Retry-After are tunable, to see how the providers behave under load.
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from benchmarks.pages import synthetic_response  # noqa: E402
+from benchmarks.replay import ReplayTransport  # noqa: E402
+
+ORIGIN = "https://www.aladin.co.kr"
+
+
+class FakeAladin(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        fixtures=None,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        throttle=0,
+        retry_after=1,
+    ):
+        super().__init__(address, FakeAladinHandler)
+        # 응답 본문은 ReplayTransport와 같은 방법으로 찾는다.
+        self.pages = ReplayTransport(fixtures, fallback=synthetic_response)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.counts = {"requests": 0, "errors": 0, "throttled": 0}
+        self._second = 0
+        self._in_second = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return "http://%s:%d" % self.server_address[:2]
+
+    def admit(self) -> int:
+        """Status to answer with before looking at the page: 200, 429 or 500"""
+        with self._lock:
+            self.counts["requests"] += 1
+            now = int(time.monotonic())
+            if now != self._second:
+                self._second, self._in_second = now, 0
+            self._in_second += 1
+            if self.throttle and self._in_second > self.throttle:
+                self.counts["throttled"] += 1
+                return 429
+            if random.random() < self.error_rate:
+                self.counts["errors"] += 1
+                return 500
+        return 200
+
+
+class FakeAladinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(server.latency + random.uniform(0, server.jitter))
+        status = server.admit()
+        headers = {}
+        if status == 200:
+            status, body, headers = server.pages.load(ORIGIN + self.path)
+        else:
+            body = ""
+        if status == 429:
+            headers = {"Retry-After": str(server.retry_after)}
+        data = body.encode("utf-8")
+        self.send_response(status)
+        content_type = "application/json" if "/ttb/api/" in self.path else "text/html"
+        self.send_header("Content-Type", content_type + "; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in headers.items():
+            if key.lower() not in ("content-type", "content-length"):
+                self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", help="directory of recorded responses")
+    parser.add_argument(
+        "--latency", type=float, default=0.1, help="seconds per response"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.05, help="up to this many more seconds"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="share of 500 answers"
+    )
+    parser.add_argument(
+        "--throttle",
+        type=int,
+        default=0,
+        help="requests per second before 429 (0: off)",
+    )
+    parser.add_argument(
+        "--retry-after", type=int, default=1, help="Retry-After of 429 answers"
+    )
+    args = parser.parse_args()
+    server = FakeAladin(
+        (args.host, args.port),
+        args.fixtures,
+        args.latency,
+        args.jitter,
+        args.error_rate,
+        args.throttle,
+        args.retry_after,
+    )
+    print("fake aladin.co.kr on %s" % server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(server.counts)
+
+
+if __name__ == "__main__":
+    main()
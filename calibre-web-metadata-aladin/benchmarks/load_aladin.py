@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Load test of the providers against the local Aladin stand-in.
+
+    python benchmarks/load_aladin.py [--users 20] [--searches 10] [--provider aladin]
+    python benchmarks/load_aladin.py --server http://127.0.0.1:8765
+
+Without --server a FakeAladin is started in-process (with the tunables of
+fake_aladin.py). N users each run M searches back to back; reported are
+throughput, latency percentiles, failed searches and what the server saw.
+The providers keep their real transport (pools, rate limiter, circuit
+breakers); only the connections are redirected to the stand-in. Their
+cache and TTB quota are replaced by temporary ones for the run.
+"""
+
+import argparse
+import concurrent.futures
+import os
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from aladin_support.http_cache import DEFAULT_TTLS, ResponseCache  # noqa: E402
+from aladin_support.rate_limit import RateLimiter  # noqa: E402
+from aladin_support.transport import Deadline  # noqa: E402
+from aladin_support.ttb import DailyQuota  # noqa: E402
+from benchmarks import bench_search  # noqa: E402
+from benchmarks.fake_aladin import FakeAladin  # noqa: E402
+
+
+class RedirectAdapter(HTTPAdapter):
+    """Sends requests for any host to ``base``, keeping path and query"""
+
+    def __init__(self, base, **kwargs):
+        super().__init__(**kwargs)
+        self.base = urlsplit(base)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = parts._replace(
+            scheme=self.base.scheme, netloc=self.base.netloc
+        ).geturl()
+        return super().send(request, **kwargs)
+
+
+def redirect(provider, base, unlimited):
+    transport = provider.transport
+    adapter = RedirectAdapter(base, pool_maxsize=transport.pool_size)
+    for prefix in (
+        "https://www.aladin.co.kr/",
+        "https://aladin.co.kr/",
+        "https://image.aladin.co.kr/",
+    ):
+        transport.session.mount(prefix, adapter)
+    if unlimited:
+        transport.limiter = RateLimiter(
+            {name: (1000.0, 1000) for name in ("html", "api", "image")}
+        )
+
+
+def run(provider, users, searches, queries):
+    """
+    (seconds, latencies, empty, timed out) of the searches. The providers log
+    and swallow their errors, so a failed search shows up as an empty answer
+    or as one which ran into the search deadline.
+    """
+    latencies = []
+    empty = timed_out = 0
+    lock = threading.Lock()
+
+    def user(number):
+        nonlocal empty, timed_out
+        for i in range(searches):
+            query = queries[(number + i) % len(queries)]
+            start = time.perf_counter()
+            try:
+                records = provider.search(query)
+            except Exception:
+                records = None
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not records:
+                    empty += 1
+                if elapsed >= provider.SEARCH_TIMEOUT:
+                    timed_out += 1
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user, range(users)))
+    return time.perf_counter() - start, latencies, empty, timed_out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "queries", nargs="*", help="search queries (default: a fixed set)"
+    )
+    parser.add_argument("--provider", choices=["aladin", "aladinapi"], default="aladin")
+    parser.add_argument(
+        "--users", type=int, default=20, help="concurrent searching users"
+    )
+    parser.add_argument("--searches", type=int, default=10, help="searches per user")
+    parser.add_argument(
+        "--server", help="URL of a running fake_aladin.py (default: start one)"
+    )
+    parser.add_argument("--fixtures", help="directory of recorded responses")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle", type=int, default=0)
+    parser.add_argument(
+        "--unlimited", action="store_true", help="lift the client side rate limits"
+    )
+    parser.add_argument(
+        "--cache", action="store_true", help="let the providers cache responses"
+    )
+    args = parser.parse_args()
+
+    server = None
+    base = args.server
+    if base is None:
+        server = FakeAladin(
+            ("127.0.0.1", 0),
+            args.fixtures,
+            args.latency,
+            args.jitter,
+            args.error_rate,
+            args.throttle,
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = server.url
+
+    provider = bench_search.load_provider(args.provider)
+    redirect(provider, base, args.unlimited)
+    fired = Deadline.fired.get(provider.__id__, 0)
+    with tempfile.TemporaryDirectory() as directory, bench_search.isolated(provider):
+        # CACHE_DIR의 캐시와 TTB 키의 오늘 한도는 건드리지 않는다.
+        if args.cache:
+            cache = ResponseCache(os.path.join(directory, "load.db"))
+        else:
+            # 모든 검색이 서버까지 가도록 캐시를 끈다.
+            cache = ResponseCache(
+                os.path.join(directory, "load.db"),
+                ttls={kind: 0 for kind in DEFAULT_TTLS},
+                miss_ttl=0,
+            )
+        type(provider).cache = cache
+        type(provider).quota = DailyQuota(cache=cache)
+        elapsed, latencies, empty, timed_out = run(
+            provider,
+            args.users,
+            args.searches,
+            args.queries or bench_search.DEFAULT_QUERIES,
+        )
+
+    total = len(latencies)
+    print(
+        "%s: %d users x %d searches against %s"
+        % (args.provider, args.users, args.searches, base)
+    )
+    print("  throughput %8.1f searches/s (%.1fs)" % (total / elapsed, elapsed))
+    print(
+        "  latency    p50 %8.1f ms  p95 %8.1f ms  p99 %8.1f ms  max %8.1f ms"
+        % tuple(
+            x * 1000
+            for x in (
+                bench_search.percentile(latencies, 50),
+                bench_search.percentile(latencies, 95),
+                bench_search.percentile(latencies, 99),
+                max(latencies or [0]),
+            )
+        )
+    )
+    print(
+        "  failed     %d empty, %d timed out (deadline fired %d times)"
+        % (empty, timed_out, Deadline.fired.get(provider.__id__, 0) - fired)
+    )
+    print("  client     %s" % provider.transport.limiter.stats())
+    if server is not None:
+        print("  server     %s" % server.counts)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
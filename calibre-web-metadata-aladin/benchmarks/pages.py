@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic Aladin pages for offline benchmarks.
+
+They only mimic the parts the providers read (ss_book_list blocks, the
+ld+json block, getContents.aspx boxes, TTB ItemSearch and ItemLookUp items) plus enough filler markup to
+reach the size of a real page. Recorded pages give more faithful
+numbers when they are available.
+"""
+
+import json
+import zlib
+from typing import Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# a real wproduct.aspx page is 300-500 KB of markup
+PRODUCT_PAGE_BYTES = 400 * 1024
+
+
+def _filler(size: int) -> str:
+    row = (
+        '<li class="Ere_sub2_title"><a href="/shop/wbrowse.aspx?CID=%d">분류 %d</a>'
+        '<span class="Ere_PR10"></span><img src="//image.aladin.co.kr/img/%d.png"/></li>\n'
+    )
+    rows = []
+    total = 0
+    n = 0
+    while total < size:
+        rows.append(row % (n, n, n))
+        total += len(rows[-1].encode("utf-8"))
+        n += 1
+    return '<div class="Ere_prod_middlewrap"><ul>' + "".join(rows) + "</ul></div>"
+
+
+def isbn13(item_id: int) -> str:
+    return "979%010d" % item_id
+
+
+def search_page(item_ids, foreign: bool = False) -> str:
+    category = "[외국도서]" if foreign else "[국내도서]"
+    books = "".join(
+        '<div class="ss_book_box"><div class="ss_book_list"><ul><li>'
+        '<span class="tit_category">%s</span>'
+        '<a class="bo3" href="https://www.aladin.co.kr/shop/wproduct.aspx?ItemId=%d">'
+        "<b>책 %d</b></a></li></ul></div></div>" % (category, item_id, item_id)
+        for item_id in item_ids
+    )
+    return (
+        "<html><head><title>[알라딘] 검색</title></head><body>"
+        + _filler(64 * 1024)
+        + '<div id="Search3_Result">'
+        + books
+        + "</div></body></html>"
+    )
+
+
+def product_page(item_id: int, size: int = PRODUCT_PAGE_BYTES) -> str:
+    isbn = isbn13(item_id)
+    data = {
+        "@context": "http://schema.org",
+        "@type": "Book",
+        "name": "책 %d" % item_id,
+        "author": {
+            "@type": "Person",
+            "name": "지은이 %d, 옮긴이 %d" % (item_id, item_id),
+        },
+        "publisher": {"@type": "Organization", "name": "출판사"},
+        "workExample": [{"@type": "Book", "isbn": isbn, "datePublished": "2023-05-01"}],
+        "genre": "국내도서>컴퓨터/모바일, 프로그래밍 언어",
+        "image": "https://image.aladin.co.kr/product/%d/1/cover500/%s_1.jpg"
+        % (item_id, isbn),
+        "description": "책 %d 소개" % item_id,
+        "aggregateRating": {"@type": "AggregateRating", "ratingValue": "9"},
+    }
+    half = _filler(size // 2)
+    return (
+        "<html><head><title>[알라딘]책 %d</title>"
+        '<meta property="og:url" content="https://www.aladin.co.kr/shop/wproduct.aspx?ItemId=%d"/>'
+        '<meta property="og:image" content="%s"/>'
+        '<meta property="books:isbn" content="%s"/>'
+        '<script type="text/javascript">var itemId = %d;</script>'
+        "</head><body>%s"
+        '<script type="application/ld+json">%s</script>'
+        "%s</body></html>"
+        % (
+            item_id,
+            item_id,
+            data["image"],
+            isbn,
+            item_id,
+            half,
+            json.dumps(data, ensure_ascii=False),
+            half,
+        )
+    )
+
+
+def contents_page(isbn: str, name: str) -> str:
+    if name == "PublisherDesc":
+        return (
+            '<div class="Ere_prod_mconts_box"><div class="Ere_prod_mconts_LS">출판사 제공 책소개</div>'
+            '<div class="Ere_prod_mconts_R"><div id="div_PublisherDesc_All"><p>%s 책소개</p></div></div></div>'
+            % isbn
+        )
+    return (
+        '<div class="Ere_prod_mconts_box"><div class="Ere_prod_mconts_LS">목차</div>'
+        '<div class="Ere_prod_mconts_R" id="tocTemplate"><div id="div_TOC_All"><p>1장</p><p>2장</p></div></div></div>'
+    )
+
+
+def api_response(item_ids, foreign: bool = False) -> str:
+    items = [
+        {
+            "itemId": item_id,
+            "title": "책 %d" % item_id,
+            "author": "저자 %d (지은이), 역자 %d (옮긴이)" % (item_id, item_id),
+            "pubDate": "2023-05-01",
+            "description": "책 %d 소개" % item_id,
+            "isbn13": isbn13(item_id),
+            "cover": "https://image.aladin.co.kr/product/%d/1/coversum/%s_1.jpg"
+            % (item_id, isbn13(item_id)),
+            "categoryName": (
+                "외국도서>Computer" if foreign else "국내도서>컴퓨터/모바일"
+            ),
+            "publisher": "출판사",
+            "customerReviewRank": 9,
+            "seriesInfo": {"seriesName": "시리즈"},
+        }
+        for item_id in item_ids
+    ]
+    return json.dumps({"version": "20131101", "item": items}, ensure_ascii=False)
+
+
+def lookup_response(item_id: int) -> str:
+    """ItemLookUp answer with the OptResult fields the providers ask for"""
+    item = json.loads(api_response([item_id]))["item"][0]
+    item["cover"] = item["cover"].replace("coversum", "cover500")
+    item["fullDescription2"] = "<p>%s 책소개</p>" % item["isbn13"]
+    item["subInfo"] = {"toc": "<p>1장</p><p>2장</p>", "story": ""}
+    return json.dumps({"version": "20131101", "item": [item]}, ensure_ascii=False)
+
+
+def synthetic_response(url: str) -> Tuple[int, str]:
+    """(status, body) of a synthetic page for any URL the providers request"""
+    parts = urlsplit(url)
+    path = parts.path.lower()
+    query = parse_qs(parts.query)
+    # 검색어마다 다른 결과가 나오도록 ItemId를 검색어에서 만든다.
+    seed = zlib.crc32(parts.query.encode("utf-8")) % 100000 * 10
+    if path.endswith("wsearchresult.aspx"):
+        return 200, search_page(range(seed + 1, seed + 6))
+    if path.endswith("wproduct.aspx"):
+        if "ItemId" in query:
+            return 200, product_page(int(query["ItemId"][0]))
+        isbn = query.get("ISBN", ["0"])[0]
+        return 200, product_page(int(isbn[-10:-1] or 0))
+    if path.endswith("getcontents.aspx"):
+        return 200, contents_page(query["ISBN"][0], query["name"][0])
+    if path.endswith("itemlookup.aspx"):
+        item_id = query.get("ItemId", ["0"])[0]
+        if query.get("itemIdType", ["ItemId"])[0] != "ItemId":
+            item_id = item_id[-10:-1]
+        return 200, lookup_response(int(item_id or 0))
+    if path.endswith("itemsearch.aspx"):
+        foreign = query.get("SearchTarget") == ["Foreign"]
+        seed += 5 if foreign else 0
+        return 200, api_response(range(seed + 1, seed + 6), foreign)
+    return 404, ""
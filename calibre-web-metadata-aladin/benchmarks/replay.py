@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Record and replay the HTTP traffic of the providers.
+
+RecordingTransport wraps a live transport and writes every response to a
+fixture file; ReplayTransport serves those files (or synthetic pages)
+with injected latency, so searches can be measured without network.
+Both stand in for PooledTransport: ``provider.transport = ReplayTransport(...)``.
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import requests
+
+from aladin_support.http_cache import canonical_url
+from aladin_support.transport import Deadline
+
+
+def fixture_name(url: str) -> str:
+    return hashlib.sha1(canonical_url(url).encode("utf-8")).hexdigest() + ".json"
+
+
+def make_response(
+    url: str, status: int, body: str, headers: Optional[Dict] = None
+) -> requests.Response:
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response.encoding = "utf-8"
+    response.headers.update(headers or {})
+    response._content = body.encode("utf-8")
+    return response
+
+
+class RecordingTransport:
+    """Passes requests to ``inner`` and saves each response under ``directory``"""
+
+    def __init__(self, inner, directory: str):
+        self.inner = inner
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get(
+        self, url: str, deadline: Optional[Deadline] = None, **kwargs
+    ) -> requests.Response:
+        response = self.inner.get(url, deadline=deadline, **kwargs)
+        fixture = {
+            "url": canonical_url(url),
+            "status": response.status_code,
+            "headers": {
+                k: v for k, v in response.headers.items() if k.lower() == "content-type"
+            },
+            "body": response.text,
+        }
+        with open(
+            os.path.join(self.directory, fixture_name(url)), "w", encoding="utf-8"
+        ) as f:
+            json.dump(fixture, f, ensure_ascii=False)
+        return response
+
+    def available(self) -> bool:
+        return self.inner.available()
+
+    def stats(self) -> Dict:
+        return self.inner.stats()
+
+
+class ReplayTransport:
+    """
+    Serves recorded fixtures, falling back to ``fallback(url) -> (status, body)``
+    for URLs which were never recorded. Every request sleeps ``latency``
+    seconds, plus up to ``jitter`` more, and times out like a real one.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        fallback: Optional[Callable[[str], Tuple[int, str]]] = None,
+    ):
+        self.directory = directory
+        self.latency = latency
+        self.jitter = jitter
+        self.fallback = fallback
+        self.requests = 0
+        self.missing = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def load(self, url: str) -> Tuple[int, str, Dict]:
+        if self.directory:
+            path = os.path.join(self.directory, fixture_name(url))
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    fixture = json.load(f)
+                return fixture["status"], fixture["body"], fixture.get("headers", {})
+        with self._lock:
+            self.missing += 1
+        if self.fallback is not None:
+            status, body = self.fallback(url)
+            return status, body, {}
+        return 404, "", {}
+
+    def get(
+        self, url: str, deadline: Optional[Deadline] = None, **kwargs
+    ) -> requests.Response:
+        timeout = kwargs.get("timeout", 10.0)
+        if deadline is not None:
+            timeout = deadline.timeout(timeout)
+        with self._lock:
+            self.requests += 1
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > timeout:
+            time.sleep(timeout)
+            raise requests.exceptions.ReadTimeout(
+                "%s: replay latency %.2fs > %.2fs" % (url, delay, timeout)
+            )
+        time.sleep(delay)
+        status, body, headers = self.load(url)
+        with self._lock:
+            self.bytes += len(body.encode("utf-8"))
+        return make_response(url, status, body, headers)
+
+    def available(self) -> bool:
+        return True
+
+    def stats(self) -> Dict:
+        return {"requests": self.requests, "missing": self.missing, "bytes": self.bytes}
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import tempfile
+
+import pytest
+
+from cps import constants
+
+# The providers' process wide cache and TTB quota live under CACHE_DIR, which
+# is calibre-web's cps/cache unless set; the tests keep them in a temporary one.
+_cache_dir = tempfile.TemporaryDirectory(prefix="metadata-tests-")
+constants.CACHE_DIR = _cache_dir.name
+
+
+class FakeClock:
+    """Stands in for time.monotonic/time.time and time.sleep"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+        self.slept = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+    def sleep(self, seconds: float) -> None:
+        self.slept += seconds
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
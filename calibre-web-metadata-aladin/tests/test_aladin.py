@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import concurrent.futures
+import json
+import os
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from aladin import Aladin, extract_json_ld, parse_json_ld
+from aladin_support.http_cache import ResponseCache
+from aladin_support.transport import Deadline
+from aladin_support.ttb import DailyQuota
+from benchmarks.pages import product_page, search_page, synthetic_response
+from benchmarks.replay import ReplayTransport
+
+BOOK = {"@type": "Book", "name": "클린 코드", "author": {"name": "로버트 C. 마틴"}}
+
+
+@pytest.fixture
+def aladin(monkeypatch, tmp_path, clock):
+    """Aladin on synthetic pages, with a cache and TTB quota of its own"""
+    cache = ResponseCache(os.path.join(str(tmp_path), "aladin.db"), clock=clock)
+    monkeypatch.setattr(Aladin, "cache", cache)
+    monkeypatch.setattr(Aladin, "quota", DailyQuota(cache=None))
+    monkeypatch.setattr(
+        Aladin, "transport", ReplayTransport(fallback=synthetic_response)
+    )
+    return Aladin()
+
+
+def page(script):
+    return "<html><head><title>책</title></head><body>%s</body></html>" % script
+
+
+def ld_json(data):
+    return '<script type="application/ld+json">%s</script>' % json.dumps(
+        data, ensure_ascii=False
+    )
+
+
+def test_extract_json_ld_reads_the_block_without_parsing_the_page():
+    text = page(ld_json(BOOK))
+    assert extract_json_ld(text) == BOOK
+    assert parse_json_ld(text) == BOOK
+    # Aladin sometimes sends a list of blocks
+    assert extract_json_ld(page(ld_json([BOOK]))) == BOOK
+    assert extract_json_ld(product_page(7))["name"] == "책 7"
+
+
+def test_malformed_json_ld_gives_none_on_both_paths():
+    text = page('<script type="application/ld+json">{"name": "책",</script>')
+    assert extract_json_ld(text) is None
+    assert parse_json_ld(text) is None
+    assert extract_json_ld(page("")) is None
+
+
+def test_the_soup_fallback_finds_a_block_the_scan_misses(aladin):
+    # the first mention of the marker is no script tag, so the scan gives up
+    text = page("<p>application/ld+json</p>" + ld_json(BOOK))
+    assert extract_json_ld(text) is None
+    assert parse_json_ld(text) == BOOK
+    link = Aladin.PRODUCT_URL + "42"
+    record = aladin._parse_record(link, "한국어", text)
+    assert (record.id, record.title, record.authors) == (
+        "42",
+        "클린 코드",
+        ["로버트 C. 마틴"],
+    )
+
+
+def test_isbn_query_costs_one_request(aladin):
+    records = aladin.search("978-89-374-6077-7")
+    assert len(records) == 1
+    assert records[0].description.endswith("<br/><p>1장</p><p>2장</p>")
+    # one ItemLookUp, no search page
+    assert aladin.transport.requests == 1
+    aladin.search("9788937460777")
+    assert aladin.transport.requests == 1
+
+
+def test_isbn_query_without_lookup_reads_only_the_product_page(aladin, monkeypatch):
+    monkeypatch.setattr(Aladin, "LOOKUP", False)
+    monkeypatch.setattr(Aladin, "LAZY_DESCRIPTION", True)
+    records = aladin.search("9788937460777")
+    assert len(records) == 1
+    assert aladin.transport.requests == 1
+    aladin.load_description(records[0])
+    assert "1장" in records[0].description
+    assert aladin.transport.requests == 3
+
+
+def test_search_returns_partial_results_when_the_deadline_expires(aladin, monkeypatch):
+    slow = {"1", "3"}
+    looked_up = []
+
+    def respond(url):
+        if "wsearchresult" in url:
+            return 200, search_page(range(1, 6))
+        # ItemLookUp, or the product page if the search fell back to it
+        item_id = parse_qs(urlsplit(url).query)["ItemId"][0]
+        looked_up.append(item_id)
+        if item_id in slow:
+            time.sleep(1.0)
+        return synthetic_response(url)
+
+    # two workers: 1 and 3 hold them up, 4 and 5 never start
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(Aladin, "executor", executor)
+    monkeypatch.setattr(Aladin, "transport", ReplayTransport(fallback=respond))
+    monkeypatch.setattr(Aladin, "SEARCH_TIMEOUT", 0.3)
+    fired = Deadline.fired.get("aladin", 0)
+
+    start = time.monotonic()
+    results = list(aladin.search_iter("클린 코드"))
+    assert time.monotonic() - start < 0.9
+    assert [(index, record.id) for index, record in results] == [(1, "2")]
+    assert Deadline.fired["aladin"] == fired + 1
+
+    executor.shutdown(wait=True)
+    assert sorted(looked_up) == ["1", "2", "3"]
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from aladinapi import AladinAPI
+from aladin_support.http_cache import ResponseCache, miss_key
+from aladin_support.ttb import DailyQuota, QuotaExceeded
+from benchmarks.pages import api_response, synthetic_response
+from benchmarks.replay import ReplayTransport
+
+
+def isbn13(n):
+    body = "979110%06d" % n
+    total = sum((3 if i % 2 else 1) * int(c) for i, c in enumerate(body))
+    return body + str(-total % 10)
+
+
+def replay(foreign=None, domestic=None):
+    """ReplayTransport answering ItemSearch per target with (status, body), if given"""
+
+    def respond(url):
+        answer = foreign if "SearchTarget=Foreign" in url else domestic
+        return answer or synthetic_response(url)
+
+    return ReplayTransport(fallback=respond)
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path, clock):
+    """AladinAPI on synthetic answers, with a cache and TTB quota of its own"""
+    cache = ResponseCache(os.path.join(str(tmp_path), "aladin.db"), clock=clock)
+    monkeypatch.setattr(AladinAPI, "cache", cache)
+    monkeypatch.setattr(AladinAPI, "quota", DailyQuota(cache=None))
+    monkeypatch.setattr(AladinAPI, "transport", replay())
+    return AladinAPI()
+
+
+def test_domestic_hits_survive_a_failing_foreign_search(api, monkeypatch):
+    monkeypatch.setattr(AladinAPI, "transport", replay(foreign=(500, "")))
+    records = api.search("클린 코드")
+    assert len(records) == AladinAPI.MAX_RESULTS
+    assert {record.languages for record in records} == {"kor"}
+    # one target failed, so the query is not remembered as a miss
+    assert not api.cache.is_miss(api.__id__, miss_key("클린 코드"))
+
+
+def test_a_miss_is_remembered_only_when_both_targets_answer_empty(
+    api, monkeypatch, clock
+):
+    empty = (200, api_response([]))
+    monkeypatch.setattr(
+        AladinAPI, "transport", replay(foreign=(500, ""), domestic=empty)
+    )
+    assert api.search("없는 책") == []
+    assert api.search("없는 책") == []
+    assert api.transport.requests == 4
+
+    monkeypatch.setattr(AladinAPI, "transport", replay(foreign=empty, domestic=empty))
+    assert api.search("없는 책") == []
+    assert api.search("없는 책") == []
+    assert api.transport.requests == 2
+    clock.advance(api.cache.miss_ttl + 1)
+    api.search("없는 책")
+    assert api.transport.requests == 4
+
+
+def test_lookup_isbns_looks_up_each_book_once(api):
+    inputs = ["8937460777", "9788937460777", "978-89-374-6077-7", "garbage"]
+    results = dict(api.lookup_isbns(inputs))
+    assert results["garbage"] is None
+    record = results["8937460777"]
+    assert results["9788937460777"] is record
+    assert results["978-89-374-6077-7"] is record
+    assert api.transport.requests == 1
+    # the same record shape as Aladin's ItemLookUp results
+    assert record.authors == ["저자 893746077"]
+    assert record.tags == ["국내도서>컴퓨터/모바일"]
+    assert record.languages == ["한국어"]
+    assert "/cover500/" in record.cover
+    assert record.rating == 4.5
+    assert record.description.endswith("<br/><p>1장</p><p>2장</p>")
+
+
+def test_lookup_isbns_stops_when_the_quota_is_used_up(api, monkeypatch):
+    monkeypatch.setattr(AladinAPI, "quota", DailyQuota(limit=3, cache=None))
+    isbns = [isbn13(n) for n in range(5)]
+    found = []
+    with pytest.raises(QuotaExceeded, match="2 ISBNs not looked up"):
+        for isbn, record in api.lookup_isbns(isbns, workers=1, reserve=0):
+            found.append(isbn)
+            assert record is not None
+    assert found == isbns[:3]
+    assert api.transport.requests == 3
+
+    # cached answers take no call from the quota
+    again = dict(api.lookup_isbns(isbns[:3], reserve=0))
+    assert sorted(again) == isbns[:3] and all(again.values())
+    assert api.transport.requests == 3
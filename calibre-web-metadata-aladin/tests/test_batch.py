@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from aladin_support.batch import BatchSearch
+
+WAIT = 5
+
+
+class Provider(BatchSearch):
+    __name__ = "Test"
+    BATCH_WORKERS = 2
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = []
+        self._lock = threading.Lock()
+
+    def search(self, query, generic_cover="", locale="en"):
+        with self._lock:
+            self.started.append(query)
+        if query == "slow":
+            assert self.release.wait(WAIT)
+        if query == "bad":
+            raise ValueError("broken page")
+        if query == "none":
+            return None
+        return [query.upper()]
+
+
+def test_search_many_answers_every_query_under_its_index():
+    provider = Provider()
+    queries = ["slow", "a", "bad", "none", "b"]
+    results = {}
+    for index, records in provider.search_many(queries):
+        results[index] = records
+        if len(results) == len(queries) - 1:
+            # everything behind the slow query finished first
+            provider.release.set()
+    assert results == {0: ["SLOW"], 1: ["A"], 2: [], 3: [], 4: ["B"]}
+
+
+def test_a_failing_query_does_not_stop_the_batch():
+    provider = Provider()
+    provider.release.set()
+    results = dict(provider.search_many(["bad", "a", "bad", "b"]))
+    assert results == {0: [], 1: ["A"], 2: [], 3: ["B"]}
+    assert sorted(provider.started) == ["a", "b", "bad", "bad"]
+
+
+def test_no_more_than_batch_workers_queries_run_at_once():
+    provider = Provider()
+    batch = provider.search_many(["slow", "slow", "a"])
+    answers = []
+    first = threading.Thread(target=lambda: answers.append(next(batch)))
+    first.start()
+    first.join(0.2)
+    # both slots are taken by the slow queries, "a" waits for one of them
+    assert provider.started == ["slow", "slow"]
+    provider.release.set()
+    first.join(WAIT)
+    answers.extend(batch)
+    assert sorted(index for index, _ in answers) == [0, 1, 2]
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+from aladin_support.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def breaker(clock, **kwargs):
+    kwargs.setdefault("failure_threshold", 3)
+    kwargs.setdefault("reset_timeout", 30)
+    return CircuitBreaker("test", clock=clock, **kwargs)
+
+
+def fail(b, times):
+    for _ in range(times):
+        assert b.allow()
+        b.record(False)
+
+
+def test_opens_after_consecutive_failures(clock):
+    b = breaker(clock)
+    fail(b, 2)
+    assert b.state == CLOSED
+    fail(b, 1)
+    assert b.state == OPEN
+    assert not b.allow()
+    assert b.stats() == {"state": OPEN, "failures": 3, "opened": 1}
+
+
+def test_success_resets_the_failure_count(clock):
+    b = breaker(clock)
+    fail(b, 2)
+    b.record(True)
+    fail(b, 2)
+    assert b.state == CLOSED
+
+
+def test_half_open_probe_closes_on_success(clock):
+    b = breaker(clock, probes=1)
+    fail(b, 3)
+    clock.advance(29)
+    assert not b.allow()
+    clock.advance(1)
+    assert b.state == HALF_OPEN
+    assert b.allow()
+    assert not b.allow()
+    b.record(True)
+    assert b.state == CLOSED
+    assert b.allow()
+
+
+def test_half_open_probe_reopens_on_failure(clock):
+    b = breaker(clock)
+    fail(b, 3)
+    clock.advance(30)
+    assert b.allow()
+    b.record(False)
+    assert b.state == OPEN
+    assert b.stats()["opened"] == 2
+    clock.advance(29)
+    assert not b.allow()
+
+
+def test_slow_calls_count_as_failures(clock):
+    b = breaker(clock, slow_call=5.0)
+    for _ in range(3):
+        assert b.allow()
+        b.record(True, latency=6.0)
+    assert b.state == OPEN
+
+
+def test_unknown_outcome_frees_the_probe_without_counting(clock):
+    b = breaker(clock)
+    fail(b, 3)
+    clock.advance(30)
+    assert b.allow()
+    b.record(None)
+    assert b.state == HALF_OPEN
+    assert b.allow()
+
+
+def test_reset(clock):
+    b = breaker(clock)
+    fail(b, 3)
+    b.reset()
+    assert b.state == CLOSED
+    assert b.allow()
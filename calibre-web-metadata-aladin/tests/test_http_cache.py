@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from aladin_support.http_cache import (
+    ACCESS_RESOLUTION,
+    BloomFilter,
+    ResponseCache,
+    canonical_url,
+    miss_key,
+    page_kind,
+)
+
+PRODUCT = "https://www.aladin.co.kr/shop/wproduct.aspx?ItemId=%d"
+CONTENTS = "https://www.aladin.co.kr/shop/product/getContents.aspx?ISBN=1&name=Introduce&date=%d"
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return ResponseCache(
+        os.path.join(str(tmp_path), "metadata", "test.db"),
+        max_bytes=3000,
+        ttls={"product": 100},
+        miss_ttl=50,
+        clock=clock,
+    )
+
+
+def test_canonical_url_ignores_order_host_alias_and_cache_busters():
+    assert canonical_url("http://aladin.co.kr/a.aspx?b=2&a=1&date=13") == canonical_url(
+        "https://www.aladin.co.kr/a.aspx?a=1&b=2"
+    )
+    assert canonical_url(PRODUCT % 1) != canonical_url(PRODUCT % 2)
+    assert miss_key("  Clean   CODE ") == "clean code"
+    assert page_kind(CONTENTS % 1) == "contents"
+
+
+def test_round_trip_and_fresh_for_ttl(cache, clock):
+    assert cache.get(PRODUCT % 1) is None
+    cache.set(PRODUCT % 1, "page")
+    assert cache.get(PRODUCT % 1) == "page"
+    clock.advance(101)
+    assert cache.get(PRODUCT % 1) is None
+    assert cache.get(PRODUCT % 1, stale=True) == "page"
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+
+
+def test_cache_busting_parameter_hits_the_same_entry(cache, clock):
+    cache.set(CONTENTS % 9, "toc")
+    assert cache.get(CONTENTS % 10) == "toc"
+
+
+def test_evicts_least_recently_read(cache, clock):
+    cache.set(PRODUCT % 1, "a" * 1000)
+    clock.advance(1)
+    cache.set(PRODUCT % 2, "b" * 1000)
+    clock.advance(ACCESS_RESOLUTION)
+    assert cache.get(PRODUCT % 1)
+    cache.set(PRODUCT % 3, "c" * 1000)
+    cache.set(PRODUCT % 4, "d" * 1000)
+    assert cache.get(PRODUCT % 2) is None
+    assert cache.get(PRODUCT % 1) and cache.get(PRODUCT % 3) and cache.get(PRODUCT % 4)
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 3000
+
+
+def test_oversized_and_empty_bodies_are_not_stored(cache):
+    cache.set(PRODUCT % 1, "x" * 3001)
+    cache.set(PRODUCT % 2, "")
+    assert cache.get(PRODUCT % 1) is None and cache.get(PRODUCT % 2) is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_misses_expire(cache, clock):
+    assert not cache.is_miss("aladin", "nothing")
+    cache.add_miss("aladin", "nothing")
+    assert cache.is_miss("aladin", "nothing")
+    assert not cache.is_miss("aladinapi", "nothing")
+    clock.advance(51)
+    assert not cache.is_miss("aladin", "nothing")
+    assert cache.stats()["negative_hits"] == 1
+
+
+def test_mappings_expire(cache, clock):
+    cache.set_mapping("isbn", "9788937460777", "123")
+    assert cache.get_mapping("isbn", "9788937460777") == "123"
+    assert cache.get_mapping("isbn", "9788937460777", ttl=10) == "123"
+    clock.advance(11)
+    assert cache.get_mapping("isbn", "9788937460777", ttl=10) is None
+
+
+def test_entries_survive_reopening(tmp_path, clock):
+    path = os.path.join(str(tmp_path), "test.db")
+    first = ResponseCache(path, clock=clock)
+    first.set(PRODUCT % 1, "page")
+    first.add_miss("aladin", "nothing")
+    second = ResponseCache(path, clock=clock)
+    assert second.get(PRODUCT % 1) == "page"
+    assert second.is_miss("aladin", "nothing")
+
+
+def test_unwritable_path_disables_the_cache(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = ResponseCache(os.path.join(str(blocker), "test.db"))
+    cache.set(PRODUCT % 1, "page")
+    assert cache.get(PRODUCT % 1) is None
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(100)
+    for i in range(100):
+        bloom.add("key%d" % i)
+    assert all(bloom.might_contain("key%d" % i) for i in range(100))
+    assert sum(bloom.might_contain("other%d" % i) for i in range(1000)) < 50
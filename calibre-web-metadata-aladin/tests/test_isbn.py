@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from aladin_support.isbn import is_korean, normalize_isbn, to_isbn13
+
+
+@pytest.mark.parametrize(
+    "query, isbn",
+    [
+        ("9788937460777", "9788937460777"),
+        ("978-89-374-6077-7", "9788937460777"),
+        ("ISBN: 978 89 374 6077 7", "9788937460777"),
+        ("8937460777", "8937460777"),
+        ("0-8044-2957-x", "080442957X"),
+        # wrong check digits, titles and partial numbers are no ISBNs
+        ("9788937460778", None),
+        ("8937460778", None),
+        ("클린 코드", None),
+        ("97889374607", None),
+    ],
+)
+def test_normalize_isbn(query, isbn):
+    assert normalize_isbn(query) == isbn
+
+
+def test_to_isbn13():
+    assert to_isbn13("8937460777") == "9788937460777"
+    assert to_isbn13("080442957X") == "9780804429573"
+    assert to_isbn13("9791169210027") == "9791169210027"
+    assert normalize_isbn(to_isbn13("080442957X"))
+
+
+def test_is_korean():
+    assert is_korean("9788937460777") and is_korean("8937460777")
+    assert is_korean("9791169210027")
+    assert not is_korean("9780804429573")
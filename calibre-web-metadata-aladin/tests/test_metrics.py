@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from aladin_support import metrics, ttb
+from aladin_support.rate_limit import get_rate_limiter
+from aladin_support.singleflight import SingleFlight
+from aladin_support.transport import Deadline, PooledTransport
+
+
+def gauges_and_counters(snapshot, name):
+    return snapshot["counters"].get(name, []) + snapshot["gauges"].get(name, [])
+
+
+def test_primitives_reach_the_export():
+    flight = SingleFlight("test-metrics")
+    flight.do("k", lambda: None)
+    Deadline(0, "test-metrics").fire()
+    transport = PooledTransport(name="test-metrics")
+    breaker = transport.breaker("https://www.aladin.co.kr/")
+    for _ in range(breaker.failure_threshold):
+        breaker.record(False)
+    get_rate_limiter()
+
+    text = metrics.prometheus_text()
+    assert 'metadata_singleflight_calls_total{provider="test-metrics"} 1' in text
+    assert 'metadata_deadline_fired_total{provider="test-metrics"} 1' in text
+    assert (
+        'metadata_circuit_state{host="www.aladin.co.kr",provider="test-metrics"} 2'
+        in text
+    )
+    assert "# TYPE metadata_rate_limit_throttled_total counter" in text
+
+    snapshot = metrics.snapshot()
+    opens = gauges_and_counters(snapshot, "metadata_circuit_opens_total")
+    assert {
+        "labels": {"provider": "test-metrics", "host": "www.aladin.co.kr"},
+        "value": 1,
+    } in opens
+    assert gauges_and_counters(snapshot, "metadata_rate_limit_rate")
+    transport.close()
+
+
+def test_timed_phases_are_exported():
+    with metrics.phase("test-metrics", "decode_api"):
+        pass
+    text = metrics.prometheus_text()
+    assert (
+        'metadata_phase_seconds_count{phase="decode_api",provider="test-metrics"} 1'
+        in text
+    )
+
+
+def test_quota_series_are_labelled_with_a_hash_of_the_key(monkeypatch):
+    monkeypatch.setattr(ttb, "_quotas", {})
+    for key in ("first-key", "second-key"):
+        ttb._quotas[key] = ttb.DailyQuota(limit=10, ttb_key=key)
+    ttb._quotas["first-key"].take()
+
+    text = metrics.prometheus_text()
+    assert "first-key" not in text
+    assert 'metadata_ttb_quota_used{key="%s"} 1' % ttb.key_id("first-key") in text
+    assert 'metadata_ttb_quota_used{key="%s"} 0' % ttb.key_id("second-key") in text
+
+
+def test_log_metrics_writes_the_debug_log_once_per_interval(monkeypatch, caplog, clock):
+    monkeypatch.setattr(metrics.time, "monotonic", clock)
+    monkeypatch.setattr(metrics, "_logged_at", None)
+    caplog.set_level(logging.DEBUG, logger=metrics.log.name)
+    with metrics.phase("test-metrics", "search"):
+        pass
+
+    assert metrics.log_metrics()
+    assert "metadata_phase_seconds" in caplog.text
+    clock.advance(metrics.LOG_INTERVAL - 1)
+    assert not metrics.log_metrics()
+    clock.advance(1)
+    assert metrics.log_metrics()
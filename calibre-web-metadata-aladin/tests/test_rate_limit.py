@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from aladin_support.rate_limit import (
+    MAX_BACKOFF,
+    RateLimiter,
+    TokenBucket,
+    parse_retry_after,
+)
+
+
+def bucket(clock, rate=2.0, burst=2):
+    return TokenBucket("test", rate, burst, clock=clock, sleep=clock.sleep)
+
+
+def test_burst_is_free_then_tokens_come_at_rate(clock):
+    b = bucket(clock)
+    assert b.acquire() and b.acquire()
+    assert clock.slept == 0
+    assert b.acquire()
+    assert clock.slept == pytest.approx(0.5)
+
+
+def test_idle_time_refills_up_to_burst(clock):
+    b = bucket(clock)
+    b.acquire()
+    b.acquire()
+    clock.advance(60)
+    for _ in range(2):
+        assert b.acquire()
+    assert clock.slept == 0
+    assert b.acquire()
+    assert clock.slept == pytest.approx(0.5)
+
+
+def test_acquire_gives_up_without_waiting_past_timeout(clock):
+    b = bucket(clock, rate=1.0, burst=1)
+    assert b.acquire()
+    assert not b.acquire(timeout=0.5)
+    assert clock.slept == 0
+    assert b.acquire(timeout=1.0)
+
+
+def test_throttle_halves_rate_and_pauses_for_retry_after(clock):
+    b = bucket(clock, rate=4.0, burst=4)
+    assert b.throttle(retry_after=10) == 10
+    assert b.rate == 2.0
+    assert b.stats() == {"rate": 2.0, "throttled": 1, "paused": 10.0}
+    assert not b.acquire(timeout=5)
+    assert b.acquire()
+    assert clock.slept >= 10
+
+
+def test_throttle_backs_off_exponentially_and_caps(clock):
+    b = bucket(clock, rate=4.0, burst=4)
+    assert [b.throttle() for _ in range(3)] == [2, 4, 8]
+    assert b.rate == b.min_rate * 2
+    b.throttle()
+    assert b.rate == b.min_rate
+    assert b.throttle(retry_after=10 * MAX_BACKOFF) == MAX_BACKOFF
+
+
+def test_success_raises_rate_step_by_step(clock):
+    b = bucket(clock, rate=4.0, burst=4)
+    b.throttle()
+    b.succeed()
+    assert b.rate == pytest.approx(2.2)
+    for _ in range(20):
+        b.succeed()
+    assert b.rate == 4.0
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [
+        ("120", 120.0),
+        (" 5 ", 5.0),
+        ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),
+        ("soon", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_parse_retry_after(value, seconds):
+    assert parse_retry_after(value) == seconds
+
+
+def test_limiter_buckets_by_kind_of_request():
+    limiter = RateLimiter({"api": (1.0, 1)})
+    assert limiter.bucket("https://www.aladin.co.kr/shop/wproduct.aspx").name == "html"
+    assert (
+        limiter.bucket("https://www.aladin.co.kr/ttb/api/ItemLookUp.aspx").name == "api"
+    )
+    assert limiter.bucket("https://image.aladin.co.kr/product/1.jpg").name == "image"
+    assert limiter.buckets["api"].max_rate == 1.0
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+from aladin_support.singleflight import SingleFlight
+
+WAIT = 5
+
+
+def start_leader(flight, key, fn):
+    """Run flight.do(key, fn) in a thread which is inside fn when this returns"""
+    entered = threading.Event()
+    release = threading.Event()
+
+    def call():
+        entered.set()
+        assert release.wait(WAIT)
+        return fn()
+
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    future = pool.submit(flight.do, key, call)
+    assert entered.wait(WAIT)
+    pool.shutdown(wait=False)
+    return future, release
+
+
+def join(flight, key, count, fn=None):
+    """Callers which find the flight for key running and wait for it"""
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=count)
+    futures = [
+        pool.submit(flight.do, key, fn or (lambda: "own call")) for _ in range(count)
+    ]
+    pool.shutdown(wait=False)
+    return futures
+
+
+def wait_for_coalesced(flight, count):
+    for _ in range(WAIT * 100):
+        if flight.stats()["coalesced"] >= count:
+            return
+        time.sleep(0.01)
+    pytest.fail("callers were not coalesced")
+
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    calls = []
+    leader, release = start_leader(flight, "k", lambda: calls.append(1) or "page")
+    followers = join(flight, "k", 3)
+    wait_for_coalesced(flight, 3)
+    assert flight.stats() == {"calls": 1, "coalesced": 3, "in_flight": 1}
+    release.set()
+    assert leader.result(WAIT) == "page"
+    assert [f.result(WAIT) for f in followers] == ["page"] * 3
+    assert calls == [1]
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_exception_reaches_every_caller():
+    flight = SingleFlight()
+
+    def broken():
+        raise ValueError("boom")
+
+    leader, release = start_leader(flight, "k", broken)
+    followers = join(flight, "k", 2)
+    wait_for_coalesced(flight, 2)
+    release.set()
+    for future in [leader] + followers:
+        with pytest.raises(ValueError):
+            future.result(WAIT)
+
+
+def test_keys_do_not_share_and_finished_calls_run_again():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.do("a", lambda x: x, 3) == 3
+    assert flight.stats() == {"calls": 3, "coalesced": 0, "in_flight": 0}
+
+
+def test_waiting_caller_times_out_without_stopping_the_call():
+    flight = SingleFlight()
+    leader, release = start_leader(flight, "k", lambda: "late")
+    with pytest.raises(concurrent.futures.TimeoutError):
+        flight.do("k", lambda: "own call", timeout=0)
+    release.set()
+    assert leader.result(WAIT) == "late"
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from aladin_support.ttb import (
+    TTBError,
+    cover_url,
+    item_authors,
+    lookup_url,
+    parse_item,
+    redact,
+)
+
+
+@pytest.mark.parametrize(
+    "author, authors",
+    [
+        ("로버트 C. 마틴 (지은이), 박재호, 이해영 (옮긴이)", ["로버트 C. 마틴"]),
+        ("A, B (지은이), C (그림)", ["A", "B"]),
+        ("김 (글), 이 (그림), 박 (원작)", ["김", "박"]),
+        ("편집부 (엮은이)", ["편집부"]),
+        ("Jane Doe", ["Jane Doe"]),
+        ("", []),
+    ],
+)
+def test_item_authors_keeps_authors_only(author, authors):
+    assert item_authors({"author": author}) == authors
+
+
+@pytest.mark.parametrize("size", ["coversum", "cover200", "cover500"])
+def test_cover_url_asks_for_the_largest_cover(size):
+    item = {"cover": "https://image.aladin.co.kr/product/1/2/%s/k1.jpg" % size}
+    assert cover_url(item) == "https://image.aladin.co.kr/product/1/2/cover500/k1.jpg"
+
+
+def test_parse_item():
+    assert parse_item('{"item": [{"itemId": 1}]};') == {"itemId": 1}
+    assert parse_item('{"item": []}') is None
+    with pytest.raises(TTBError):
+        parse_item('{"errorCode": 10, "errorMessage": "quota"}')
+
+
+def test_redact_hides_the_ttb_key_of_urls_in_messages():
+    url = lookup_url(isbn="9791169210027", ttb_key="secret-key")
+    message = redact("500 Server Error for url: %s" % url)
+    assert "secret-key" not in message
+    assert "ttbkey=***&itemIdType=ISBN13" in message